@@ -0,0 +1,156 @@
+import datetime
+from array import array
+from bisect import bisect_left, insort
+
+# Trendline x values are days since this date, keeping the sums well scaled
+TREND_ORIGIN = datetime.date(2020, 1, 1).toordinal()
+
+
+class _Rollup:
+    """
+    Running totals for a group of entries: entry count, sentiment score sum
+    and per-emotion sums/counts
+    """
+
+    __slots__ = ("count", "score_sum", "emotion_sums", "emotion_counts")
+
+    def __init__(self):
+        self.count = 0
+        self.score_sum = 0.0
+        self.emotion_sums = {}
+        self.emotion_counts = {}
+
+    def update(self, score, emotions, sign):
+        self.count += sign
+        self.score_sum += sign * score
+        for emotion, value in emotions.items():
+            self.emotion_sums[emotion] = self.emotion_sums.get(emotion, 0.0) + sign * value
+            self.emotion_counts[emotion] = self.emotion_counts.get(emotion, 0) + sign
+            if self.emotion_counts[emotion] == 0:
+                del self.emotion_sums[emotion]
+                del self.emotion_counts[emotion]
+
+    def merge_into(self, totals):
+        totals.count += self.count
+        totals.score_sum += self.score_sum
+        for emotion, value in self.emotion_sums.items():
+            totals.emotion_sums[emotion] = totals.emotion_sums.get(emotion, 0.0) + value
+            totals.emotion_counts[emotion] = totals.emotion_counts.get(emotion, 0) + self.emotion_counts[emotion]
+
+
+class AggregateStore:
+    """
+    Incrementally maintained dashboard metrics.
+
+    Every add/remove updates the overall totals, the day, week and month
+    rollups and the least-squares sums for the trendline in O(1), so the
+    History tab can show averages, emotion distributions and the trend for
+    "All Time", "Last Week" or "Last Month" without touching every entry.
+    """
+
+    def __init__(self):
+        self.total = _Rollup()
+        self.days = {}
+        # Sorted ordinals of populated days, for date-window lookups
+        self._day_ordinals = array('i')
+        self.weeks = {}
+        self.months = {}
+        # Least-squares sufficient statistics over (days since origin, score)
+        self._sx = 0.0
+        self._sxx = 0.0
+        self._sxy = 0.0
+
+    @staticmethod
+    def _clean_emotions(entry):
+        emotions = entry.get("emotions")
+        if not isinstance(emotions, dict):
+            return {}
+        return {k: v for k, v in emotions.items() if isinstance(v, (int, float))}
+
+    def _update(self, entry, ordinal, sign):
+        score = entry.get("sentiment_score")
+        if not isinstance(score, (int, float)):
+            return
+        emotions = self._clean_emotions(entry)
+        date = datetime.date.fromordinal(ordinal)
+        week = date - datetime.timedelta(days=date.weekday())
+
+        self.total.update(score, emotions, sign)
+        for rollups, key in ((self.days, ordinal),
+                             (self.weeks, week.toordinal()),
+                             (self.months, (date.year, date.month))):
+            rollup = rollups.get(key)
+            if rollup is None:
+                rollup = rollups[key] = _Rollup()
+                if rollups is self.days:
+                    insort(self._day_ordinals, key)
+            rollup.update(score, emotions, sign)
+            if rollup.count == 0:
+                del rollups[key]
+                if rollups is self.days:
+                    del self._day_ordinals[bisect_left(self._day_ordinals, key)]
+
+        x = ordinal - TREND_ORIGIN
+        self._sx += sign * x
+        self._sxx += sign * x * x
+        self._sxy += sign * x * score
+
+    def add(self, entry, ordinal):
+        self._update(entry, ordinal, 1)
+
+    def remove(self, entry, ordinal):
+        self._update(entry, ordinal, -1)
+
+    def _days_since(self, start):
+        """
+        Yield (ordinal, rollup) for populated days on or after start
+        """
+        pos = bisect_left(self._day_ordinals, start.toordinal())
+        for ordinal in self._day_ordinals[pos:]:
+            yield ordinal, self.days[ordinal]
+
+    def window(self, start=None):
+        """
+        Totals for entries dated on or after start (all entries when None),
+        summed from the daily rollups
+        """
+        if start is None:
+            return self.total
+        totals = _Rollup()
+        for _, rollup in self._days_since(start):
+            rollup.merge_into(totals)
+        return totals
+
+    def average_score(self, start=None):
+        totals = self.window(start)
+        return totals.score_sum / totals.count if totals.count else 0.0
+
+    def emotion_averages(self, start=None):
+        totals = self.window(start)
+        return {emotion: totals.emotion_sums[emotion] / count
+                for emotion, count in totals.emotion_counts.items() if count}
+
+    def trendline(self, start=None):
+        """
+        Least-squares fit of sentiment score against date.
+        Returns (slope per day, intercept at TREND_ORIGIN), or None when the
+        entries don't span at least two distinct dates.
+        """
+        if start is None:
+            n, sx, sxx, sxy, sy = self.total.count, self._sx, self._sxx, self._sxy, self.total.score_sum
+        else:
+            n = sx = sxx = sxy = sy = 0
+            for ordinal, rollup in self._days_since(start):
+                x = ordinal - TREND_ORIGIN
+                n += rollup.count
+                sx += rollup.count * x
+                sxx += rollup.count * x * x
+                sxy += x * rollup.score_sum
+                sy += rollup.score_sum
+
+        denominator = n * sxx - sx * sx
+        if n < 2 or abs(denominator) < 1e-9:
+            return None
+        slope = (n * sxy - sx * sy) / denominator
+        intercept = (sy - slope * sx) / n
+        return slope, intercept
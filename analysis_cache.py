@@ -0,0 +1,136 @@
+import copy
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """
+    Normalize text for cache keys without changing how it scores: VADER and
+    the emotion matcher both split on whitespace, so only Unicode form and
+    runs of whitespace are folded. Case and punctuation affect VADER and
+    are kept.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class AnalysisCache:
+    """
+    Memoizes analysis results by a hash of normalized text and analyzer version.
+
+    Recent results live in a bounded in-memory LRU; with a path, results are
+    also written to a SQLite file so they survive restarts. Because the
+    analyzer version is part of every key, a lexicon or keyword change simply
+    stops old results from matching; prune() then drops them from disk.
+    """
+
+    def __init__(self, max_size=2048, path=None):
+        self.max_size = max_size
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_cache ("
+                "key TEXT PRIMARY KEY, version TEXT NOT NULL, "
+                "result TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(text, version):
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{version}:{digest}"
+
+    def get(self, key):
+        """
+        Return a copy of the cached result for key, or None
+        """
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(result)
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT result FROM analysis_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    result = json.loads(row[0])
+                    self._remember(key, result)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return copy.deepcopy(result)
+
+            self.misses += 1
+            return None
+
+    def put(self, key, result, version):
+        with self._lock:
+            self._remember(key, copy.deepcopy(result))
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO analysis_cache (key, version, result, created) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, version, json.dumps(result), time.time()),
+                )
+                self._db.commit()
+
+    def put_many(self, items, version):
+        """
+        Store several (key, result) pairs with a single disk commit
+        """
+        items = list(items)
+        with self._lock:
+            for key, result in items:
+                self._remember(key, copy.deepcopy(result))
+            if self._db is not None and items:
+                now = time.time()
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO analysis_cache (key, version, result, created) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(key, version, json.dumps(result), now) for key, result in items],
+                )
+                self._db.commit()
+
+    def _remember(self, key, result):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def prune(self, current_version):
+        """
+        Drop on-disk results computed by other analyzer versions
+        """
+        if self._db is None:
+            return 0
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM analysis_cache WHERE version != ?", (current_version,)
+            )
+            self._db.commit()
+            return cursor.rowcount
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._memory),
+            "max_size": self.max_size,
+        }
@@ -0,0 +1,179 @@
+"""
+Background analysis of saved entries.
+
+Saving an entry only persists its raw text; sentiment analysis, response
+generation and coping strategy selection are queued here and run on a
+small thread pool. Jobs are recorded in a SQLite file before they are
+dispatched, so work that was pending when the app stopped is picked up
+again on the next start, and failed jobs are retried with backoff.
+"""
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from sentiment_analyzer import get_sentiment_analyzer
+from response_generator import get_response_generator
+
+JOBS_FILE = "analysis_jobs.sqlite3"
+PENDING_LABEL = "Pending"
+
+# Recently completed entries, so their status reads "done" rather than unknown
+RECENT_RESULTS = 1000
+
+
+def analyze_entry(entry):
+    """
+    Return a copy of entry with sentiment, emotions, response and strategy filled in
+    """
+    sentiment_results = get_sentiment_analyzer().analyze_text(entry["text"])
+    generator = get_response_generator()
+    analyzed = dict(entry)
+    analyzed.update({
+        "sentiment": sentiment_results["label"],
+        "sentiment_score": sentiment_results["score"],
+        "emotions": sentiment_results.get("emotions", {}),
+        "response": generator.generate_response(entry["text"], sentiment_results),
+        "strategy": generator.get_coping_strategy(sentiment_results.get("emotions", {}), text=entry["text"]),
+    })
+    analyzed.pop("status", None)
+    return analyzed
+
+
+def pending_entry(entry):
+    """
+    Mark a raw entry as waiting for analysis
+    """
+    entry.update({"sentiment": PENDING_LABEL, "status": "pending"})
+    return entry
+
+
+class AnalysisQueue:
+    def __init__(self, store, path=JOBS_FILE, workers=2, max_attempts=5, retry_delay=2.0):
+        self.store = store
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._done = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis")
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "entry_id TEXT PRIMARY KEY, date TEXT NOT NULL, text TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, status TEXT NOT NULL, "
+            "last_error TEXT, updated REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def resume(self, pending_entries=()):
+        """
+        Re-dispatch jobs left pending or running by a previous process.
+        pending_entries are the journal's entries still waiting for
+        analysis; any without a job (the process stopped between saving
+        the entry and recording its job) get one.
+        """
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO jobs (entry_id, date, text, attempts, status, updated) "
+                "VALUES (?, ?, ?, 0, 'pending', ?)",
+                [(entry["id"], entry["date"], entry["text"], time.time()) for entry in pending_entries],
+            )
+            self._db.commit()
+            rows = self._db.execute(
+                "SELECT entry_id FROM jobs WHERE status IN ('pending', 'running')"
+            ).fetchall()
+        for (entry_id,) in rows:
+            self._executor.submit(self._run, entry_id)
+        return len(rows)
+
+    def submit(self, entry):
+        """
+        Durably record an analysis job for entry, then dispatch it
+        """
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs (entry_id, date, text, attempts, status, updated) "
+                "VALUES (?, ?, ?, 0, 'pending', ?)",
+                (entry["id"], entry["date"], entry["text"], time.time()),
+            )
+            self._db.commit()
+        self._executor.submit(self._run, entry["id"])
+
+    def _set_status(self, entry_id, status, error=None, attempts=None):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, last_error = ?, updated = ?, "
+                "attempts = COALESCE(?, attempts) WHERE entry_id = ?",
+                (status, error, time.time(), attempts, entry_id),
+            )
+            self._db.commit()
+
+    def _run(self, entry_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT date, text, attempts FROM jobs WHERE entry_id = ?", (entry_id,)
+            ).fetchone()
+        if row is None:
+            return
+        date, text, attempts = row
+        self._set_status(entry_id, "running")
+
+        try:
+            analyzed = analyze_entry({"id": entry_id, "date": date, "text": text})
+            with self._lock:
+                # The entry may have been deleted while it was being analyzed
+                if self._db.execute("SELECT 1 FROM jobs WHERE entry_id = ?", (entry_id,)).fetchone() is None:
+                    return
+            # Not under our lock: the store takes its own, which readers hold
+            # while checking job status. It also skips entries deleted since.
+            self.store.update(analyzed)
+        except Exception as e:
+            attempts += 1
+            if attempts >= self.max_attempts:
+                self._set_status(entry_id, "failed", repr(e), attempts)
+                return
+            self._set_status(entry_id, "pending", repr(e), attempts)
+            # Exponential backoff before the next attempt
+            timer = threading.Timer(self.retry_delay * 2 ** (attempts - 1),
+                                    self._executor.submit, (self._run, entry_id))
+            timer.daemon = True
+            timer.start()
+            return
+
+        with self._lock:
+            self._db.execute("DELETE FROM jobs WHERE entry_id = ?", (entry_id,))
+            self._db.commit()
+            self._done[entry_id] = None
+            while len(self._done) > RECENT_RESULTS:
+                self._done.popitem(last=False)
+
+    def status(self, entry_id):
+        """
+        One of "done", "pending", "running", "failed" or None if unknown
+        """
+        with self._lock:
+            if entry_id in self._done:
+                return "done"
+            row = self._db.execute(
+                "SELECT status FROM jobs WHERE entry_id = ?", (entry_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def retry(self, entry_id):
+        """
+        Reset a failed job and dispatch it again
+        """
+        self._set_status(entry_id, "pending", attempts=0)
+        self._executor.submit(self._run, entry_id)
+
+    def cancel(self, entry_id):
+        """
+        Drop the job for an entry that is being deleted
+        """
+        with self._lock:
+            self._db.execute("DELETE FROM jobs WHERE entry_id = ?", (entry_id,))
+            self._db.commit()
+            self._done.pop(entry_id, None)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
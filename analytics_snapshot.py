@@ -0,0 +1,270 @@
+"""
+Columnar analytics snapshot of a journal.
+
+A snapshot is a directory of Arrow IPC segment files holding id, date,
+sentiment, sentiment_score and one float32 column per emotion. Each
+refresh appends one segment with just the log records written since the
+previous refresh (the log position is kept in the segment's schema
+metadata), so keeping it current costs O(new records). Segments are read
+through memory maps. Once there are more than MAX_SEGMENTS, they are merged
+into a single compacted segment that can be streamed batch by batch
+without deduplication.
+
+Readers only see analyzed entries: rows still waiting for analysis are
+left out, and emotions are widened to float64 and rounded the way
+EntryRepository rounds them, so 0.2 reads back as 0.2.
+
+pyarrow is optional; without it snapshots are unavailable and the app
+falls back to the in-memory repository.
+"""
+import itertools
+import os
+import threading
+import datetime
+
+try:
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+from analysis_queue import PENDING_LABEL
+
+SNAPSHOT_DIR = "journal_snapshot"
+MAX_SEGMENTS = 16
+# Rows per record batch inside a segment; bounds memory when streaming
+BATCH_ROWS = 8192
+_SEGMENT_PREFIX = "segment-"
+_SEGMENT_SUFFIX = ".arrow"
+# Decimal places emotions are rounded to when read back from float32
+EMOTION_DIGITS = 6
+
+
+def available():
+    return pa is not None
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _records_table(records):
+    """
+    Build a segment table from journal log records ("put" and "delete")
+    """
+    n = len(records)
+    ops, ids, dates, labels, scores = [], [], [], [], []
+    emotions = {}
+    for i, record in enumerate(records):
+        if record.get("op") == "put":
+            entry = record["entry"]
+            ops.append("put")
+            ids.append(entry["id"])
+            dates.append(datetime.date.fromisoformat(entry["date"][:10]))
+            label = entry.get("sentiment")
+            labels.append(label if isinstance(label, str) else None)
+            score = entry.get("sentiment_score")
+            scores.append(score if isinstance(score, (int, float)) and not isinstance(score, bool) else None)
+            entry_emotions = entry.get("emotions")
+            if isinstance(entry_emotions, dict):
+                for emotion, value in entry_emotions.items():
+                    if isinstance(value, (int, float)):
+                        emotions.setdefault(emotion, [None] * n)[i] = value
+        else:
+            ops.append("delete")
+            ids.append(record["id"])
+            dates.append(None)
+            labels.append(None)
+            scores.append(None)
+
+    columns = {
+        "op": pa.array(ops, pa.string()),
+        "id": pa.array(ids, pa.string()),
+        "date": pa.array(dates, pa.date32()),
+        "sentiment": pa.array(labels, pa.string()),
+        "sentiment_score": pa.array(scores, pa.float64()),
+    }
+    for emotion, values in emotions.items():
+        columns[emotion] = pa.array(values, pa.float32())
+    return pa.table(columns)
+
+
+def _readable(data):
+    """
+    Drop the internal op column and pending entries from a table or record
+    batch, and widen its float32 emotion columns to rounded float64
+    """
+    data = data.drop_columns(["op"])
+    data = data.filter(pc.fill_null(pc.not_equal(data["sentiment"], PENDING_LABEL), True))
+    for i, field in enumerate(data.schema):
+        if field.type == pa.float32():
+            values = pc.round(pc.cast(data.column(i), pa.float64()), EMOTION_DIGITS)
+            data = data.set_column(i, pa.field(field.name, pa.float64()), values)
+    return data
+
+
+class AnalyticsSnapshot:
+    def __init__(self, store, directory=SNAPSHOT_DIR):
+        if pa is None:
+            raise ImportError("pyarrow is required for analytics snapshots")
+        self.store = store
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _segments(self):
+        names = sorted(name for name in os.listdir(self.directory)
+                       if name.startswith(_SEGMENT_PREFIX) and name.endswith(_SEGMENT_SUFFIX))
+        return [os.path.join(self.directory, name) for name in names]
+
+    @staticmethod
+    def _open(path):
+        return pa.ipc.open_file(pa.memory_map(path, "r"))
+
+    def _metadata(self, segments):
+        if not segments:
+            return None
+        return self._open(segments[-1]).schema.metadata or {}
+
+    def _version(self, segments):
+        metadata = self._metadata(segments)
+        if metadata is None:
+            return (0, 0)
+        return (int(metadata[b"log_inode"]), int(metadata[b"log_offset"]))
+
+    def _write_segment(self, table, version, compacted, number):
+        """
+        Atomically write table as segment number, recording the log version it reflects
+        """
+        path = os.path.join(self.directory, f"{_SEGMENT_PREFIX}{number:06d}{_SEGMENT_SUFFIX}")
+        tmp_path = path + ".tmp"
+        table = table.replace_schema_metadata({
+            "log_inode": str(version[0]),
+            "log_offset": str(version[1]),
+            "compacted": "1" if compacted else "0",
+        })
+        with pa.ipc.new_file(tmp_path, table.schema) as writer:
+            writer.write_table(table, max_chunksize=BATCH_ROWS)
+        os.replace(tmp_path, path)
+        return path
+
+    @staticmethod
+    def _build_table(records):
+        # Chunks may carry different emotion columns; missing ones become nulls
+        tables = [_records_table(chunk) for chunk in _chunked(records, BATCH_ROWS)]
+        if not tables:
+            return _records_table([])
+        return pa.concat_tables(tables, promote_options="default")
+
+    @staticmethod
+    def _next_number(segments):
+        if not segments:
+            return 1
+        name = os.path.basename(segments[-1])
+        return int(name[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)]) + 1
+
+    def refresh(self):
+        """
+        Bring the snapshot up to date with the journal log.
+        Returns the number of log records applied.
+        """
+        # The journal lock also keeps other processes from refreshing at the same time
+        with self._lock, self.store.locked():
+            segments = self._segments()
+            records, version = self.store.records_since(self._version(segments))
+            if records is None:
+                return self._rebuild(segments)
+            if records:
+                segments.append(self._write_segment(self._build_table(records), version, False,
+                                                    self._next_number(segments)))
+            if len(segments) > MAX_SEGMENTS:
+                self._compact(segments)
+            return len(records)
+
+    def _rebuild(self, segments):
+        """
+        Replace all segments with one compacted segment built from the journal
+        """
+        version = self.store.disk_version()
+        # Entries are streamed; only their analytic columns are held at once
+        table = self._build_table({"op": "put", "entry": entry} for entry in self.store.iter_entries())
+        self._write_segment(table, version, True, self._next_number(segments))
+        for segment in segments:
+            os.remove(segment)
+        return len(table)
+
+    def _live_table(self, segments):
+        """
+        Merge segments into one table of live entries: the last record per
+        id wins and deleted ids are dropped
+        """
+        if not segments:
+            return _records_table([])
+        if len(segments) == 1 and self._metadata(segments).get(b"compacted") == b"1":
+            return self._open(segments[0]).read_all()
+
+        table = pa.concat_tables([self._open(path).read_all() for path in segments],
+                                 promote_options="default")
+        table = table.append_column("_row", pa.array(np.arange(len(table), dtype=np.int64)))
+        last = table.group_by("id").aggregate([("_row", "max")])["_row_max"]
+        table = table.take(np.sort(last.to_numpy()))
+        table = table.filter(pc.equal(table["op"], "put"))
+        return table.drop(["_row"])
+
+    def _compact(self, segments):
+        self._write_segment(self._live_table(segments), self._version(segments), True,
+                            self._next_number(segments))
+        for segment in segments:
+            os.remove(segment)
+
+    def compact(self):
+        with self._lock, self.store.locked():
+            segments = self._segments()
+            if len(segments) > 1 or (segments and self._metadata(segments).get(b"compacted") != b"1"):
+                self._compact(segments)
+
+    def table(self, start=None):
+        """
+        Analyzed entries as a pyarrow Table, optionally only those dated on or after start
+        """
+        # The journal lock keeps other processes from removing segments while they're opened
+        with self._lock, self.store.locked():
+            table = _readable(self._live_table(self._segments()))
+        if start is not None:
+            table = table.filter(pc.greater_equal(table["date"], pa.scalar(start, pa.date32())))
+        return table
+
+    def iter_batches(self, max_rows=BATCH_ROWS):
+        """
+        Stream analyzed entries as record batches of at most max_rows rows.
+        The snapshot is compacted first so batches come straight off the
+        memory-mapped file without building the whole table.
+        """
+        self.refresh()
+        self.compact()
+        with self._lock, self.store.locked():
+            segments = self._segments()
+            if not segments:
+                return
+            reader = self._open(segments[0])
+        for i in range(reader.num_record_batches):
+            batch = _readable(reader.get_batch(i))
+            for offset in range(0, batch.num_rows, max_rows):
+                yield batch.slice(offset, max_rows)
+
+    def schema(self):
+        """
+        Column schema of the tables and batches readers get
+        """
+        with self._lock, self.store.locked():
+            segments = self._segments()
+            if not segments:
+                return _readable(_records_table([])).schema
+            schema = self._open(segments[-1]).schema
+        return _readable(schema.empty_table()).schema.remove_metadata()
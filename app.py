@@ -1,13 +1,21 @@
 import streamlit as st
-import pandas as pd
+import cProfile
 import datetime
+import io
 import json
 import os
+import pstats
+import time
 import plotly.express as px
-import plotly.graph_objects as go
-import numpy as np
-from sentiment_analyzer import SentimentAnalyzer
-from response_generator import ResponseGenerator
+from sentiment_analyzer import get_sentiment_analyzer
+from response_generator import get_response_generator
+from entry_repository import SENTIMENT_LABELS
+from chart_data import CHART_MODES, build_mood_figure
+from importer import ImportJob, parse_import_file
+from instrumentation import metrics
+from analysis_queue import PENDING_LABEL, pending_entry
+from live_preview import get_sentence_preview
+from user_journal import UserJournal, DEFAULT_USER
 
 # Load custom CSS
 def load_css():
@@ -30,21 +38,63 @@ st.set_page_config(
 # Apply custom CSS
 st.markdown(f'<style>{load_css()}</style>', unsafe_allow_html=True)
 
-# Initialize our analyzers and generators
-sentiment_analyzer = SentimentAnalyzer()
-response_generator = ResponseGenerator()
+# Hidden diagnostics: open the app with ?diagnostics=1 to record timings and show the tab.
+# Only this session's script runs are timed; other sessions stay uninstrumented.
+show_diagnostics = st.query_params.get("diagnostics") == "1"
+metrics.begin_rerun(show_diagnostics)
 
-# Function to load entries
-def load_entries():
-    if os.path.exists("journal_entries.json"):
-        with open("journal_entries.json", "r") as f:
-            return json.load(f)
-    return []
+# Optional local metrics endpoint, started once per process
+@st.cache_resource
+def start_metrics_server(port):
+    return metrics.serve(port)
 
-# Function to save entries
-def save_entries(entries):
-    with open("journal_entries.json", "w") as f:
-        json.dump(entries, f)
+if os.environ.get("JOURNAL_METRICS_PORT"):
+    start_metrics_server(int(os.environ["JOURNAL_METRICS_PORT"]))
+
+# Profile this whole script run if it was requested from the Diagnostics tab
+profiler = None
+if st.session_state.pop("profile_next_rerun", False):
+    profiler = cProfile.Profile()
+    profiler.enable()
+
+# Process-wide analyzer and generator, shared across reruns and sessions
+sentiment_analyzer = get_sentiment_analyzer()
+response_generator = get_response_generator()
+sentence_preview = get_sentence_preview()
+
+# Whose journal this session shows: the signed-in user when authentication
+# is configured, otherwise the shared default journal. Separate journals
+# are only offered to authenticated users, since they are what keeps one
+# person from reading another's entries.
+def current_user():
+    if getattr(st.user, "is_logged_in", False) and st.user.get("email"):
+        return st.user.email
+    return DEFAULT_USER
+
+# How many users' journals are kept open; the least recently used is closed
+MAX_OPEN_JOURNALS = int(os.environ.get("JOURNAL_MAX_OPEN", 32))
+
+# One journal per user, shared by all of that user's sessions in this process
+@st.cache_resource(max_entries=MAX_OPEN_JOURNALS, on_release=UserJournal.close)
+def get_user_journal(user_id):
+    return UserJournal(user_id)
+
+journal = get_user_journal(current_user())
+
+# Pick up entries written by other processes since the last rerun
+with metrics.stage("journal.refresh"):
+    journal.refresh()
+search_index = journal.search_index
+analysis_queue = journal.analysis_queue
+
+# Function to save a new entry
+def save_entry(entry):
+    with metrics.stage("journal.append"):
+        journal.append(entry)
+
+# Function to delete an entry
+def delete_entry(entry_id):
+    journal.delete(entry_id)
 
 # App title and description
 st.title("Mental Health Journal")
@@ -53,12 +103,133 @@ This app helps you track your mental well-being through daily journaling.
 Write your thoughts, and receive personalized insights and suggestions powered by AI.
 """)
 
-# Initialize session state for entries if not present
-if 'entries' not in st.session_state:
-    st.session_state.entries = load_entries()
+# Polls a pending analysis job; triggers a full rerun once it has finished
+@st.fragment(run_every=0.5)
+def analysis_progress(entry_id):
+    if analysis_queue.status(entry_id) in ("done", "failed"):
+        st.rerun()
+    st.info("Analyzing your entry...")
+
+# Analysis status and results for a saved entry
+def analysis_panel(entry_id):
+    with journal.reading():
+        entry = journal.repository.get(entry_id)
+    if entry is None:
+        return
+    
+    if entry.get("status") == "pending":
+        if analysis_queue.status(entry_id) == "failed":
+            st.error("We couldn't analyze this entry. It has been saved and you can try again.")
+            if st.button("Retry analysis"):
+                analysis_queue.retry(entry_id)
+                st.rerun()
+        else:
+            analysis_progress(entry_id)
+        return
+    
+    # Display sentiment analysis
+    st.write(f"Sentiment analysis: **{entry['sentiment']}** (Score: {entry['sentiment_score']:.2f})")
+    
+    # Display emotions if available
+    if entry.get("emotions") and any(entry["emotions"].values()):
+        emotions = entry["emotions"]
+        st.write("Emotional breakdown:")
+        cols = st.columns(3)
+        for i, (emotion, score) in enumerate(sorted(emotions.items(), key=lambda x: x[1], reverse=True)):
+            if score > 0.1:  # Only show significant emotions
+                with cols[i % 3]:
+                    st.progress(score, text=f"{emotion.capitalize()}: {score:.2f}")
+    
+    # Display response
+    st.markdown("### Your personalized response:")
+    st.markdown(f"> *{entry['response']}*")
+    
+    # Display coping strategy if available
+    if entry.get("strategy"):
+        st.markdown("### Suggested strategy:")
+        st.markdown(f"💡 *{entry['strategy']}*")
+
+# Page sizes offered for the entry history
+PAGE_SIZES = [10, 25, 50]
+
+# Start dates for the History tab time filter
+def time_filter_start(time_filter):
+    today = datetime.date.today()
+    if time_filter == "Last Week":
+        return today - datetime.timedelta(days=6)
+    if time_filter == "Last Month":
+        return today - datetime.timedelta(days=29)
+    return None
+
+# Import panel; runs as a fragment so progress polling only reruns this panel
+@st.fragment
+def import_panel():
+    job = st.session_state.get("import_job")
+    
+    if job is not None and not job.finished:
+        st.progress(job.done / max(job.total, 1), text=f"Analyzing entries: {job.done}/{job.total}")
+        time.sleep(0.5)
+        st.rerun(scope="fragment")
+    
+    if job is not None and not job.merged:
+        job.merged = True
+        if job.error is not None:
+            st.error(f"Import failed: {job.error}")
+        else:
+            # The journal already holds the imported entries; rerun to show them
+            st.session_state.import_message = f"Imported {len(job.result)} entries."
+            st.rerun()
+    
+    if st.session_state.get("import_message"):
+        st.success(st.session_state.pop("import_message"))
+    
+    uploaded = st.file_uploader("Journal file (JSON array or JSON Lines with 'date' and 'text')",
+                                type=["json", "jsonl"])
+    if uploaded is not None and st.button("Import", use_container_width=True):
+        try:
+            entries, skipped = parse_import_file(uploaded.getvalue())
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            st.error(f"Could not read this file: {e}")
+            return
+        if skipped:
+            st.warning(f"Skipped {skipped} entries without a valid date or text.")
+        if entries:
+            st.session_state.import_job = ImportJob(entries, journal).start()
+            st.rerun(scope="fragment")
+        else:
+            st.error("No entries to import.")
+
+# Entry text box with an optional live preview; typing only reruns this fragment
+@st.fragment
+def entry_editor():
+    # Fragment reruns skip the top of the script, so scope timing here too
+    metrics.enable_thread(show_diagnostics)
+    st.text_area("How are you feeling today?", height=250, key="entry_text")
+    if not st.toggle("Live preview", key="live_preview") or not st.session_state.entry_text.strip():
+        return
+    
+    # The session's running preview only re-scores the sentences around each edit
+    if "running_preview" not in st.session_state:
+        st.session_state.running_preview = sentence_preview.running()
+    preview = st.session_state.running_preview.analyze(st.session_state.entry_text)
+    st.caption(f"Live mood: **{preview['label']}** ({preview['score']:.2f}) "
+               f"across {len(preview['sentences'])} sentences")
+    top_emotions = [f"{emotion.capitalize()}: {score:.2f}"
+                    for emotion, score in sorted(preview["emotions"].items(), key=lambda x: x[1], reverse=True)[:3]
+                    if score > 0.1]
+    if top_emotions:
+        st.caption(f"Top emotions: {', '.join(top_emotions)}")
+
+# Mood chart, rebuilt only when the journal or the selected view changes
+@st.cache_data(max_entries=32)
+def mood_figure(data_version, start_date, chart_mode, _repository):
+    return build_mood_figure(_repository, start_date, chart_mode)
 
 # Create tabs
-tab1, tab2, tab3 = st.tabs(["Journal Entry", "History & Insights", "About"])
+tab_names = ["Journal Entry", "History & Insights", "About"]
+if show_diagnostics:
+    tab_names.append("Diagnostics")
+tab1, tab2, tab3, *diagnostics_tab = st.tabs(tab_names)
 
 # Journal Entry Tab
 with tab1:
@@ -68,61 +239,28 @@ with tab1:
     
     with col1:
         entry_date = st.date_input("Date", datetime.date.today())
-        entry_text = st.text_area("How are you feeling today?", height=250)
+        entry_editor()
+        entry_text = st.session_state.get("entry_text", "")
         
         if st.button("Save Entry", use_container_width=True):
             if entry_text:
-                with st.spinner("Analyzing your entry..."):
-                    # Analyze sentiment with our enhanced analyzer
-                    sentiment_results = sentiment_analyzer.analyze_text(entry_text)
-                    
-                    # Generate supportive response
-                    response = response_generator.generate_response(entry_text, sentiment_results)
-                    
-                    # Get coping strategy if available
-                    strategy = response_generator.get_coping_strategy(sentiment_results.get("emotions", {}))
-                    
-                    # Create entry
-                    entry = {
-                        "date": entry_date.strftime("%Y-%m-%d"),
-                        "text": entry_text,
-                        "sentiment": sentiment_results["label"],
-                        "sentiment_score": sentiment_results["score"],
-                        "emotions": sentiment_results.get("emotions", {}),
-                        "response": response,
-                        "strategy": strategy
-                    }
-                    
-                    # Add to entries
-                    st.session_state.entries.append(entry)
-                    save_entries(st.session_state.entries)
+                # Persist the raw entry right away; analysis runs in the background
+                entry = pending_entry({
+                    "date": entry_date.strftime("%Y-%m-%d"),
+                    "text": entry_text
+                })
+                save_entry(entry)
+                analysis_queue.submit(entry)
+                st.session_state.last_saved_id = entry["id"]
                 
                 # Show success message
                 st.success("Entry saved successfully!")
-                
-                # Display sentiment analysis
-                st.write(f"Sentiment analysis: **{sentiment_results['label']}** (Score: {sentiment_results['score']:.2f})")
-                
-                # Display emotions if available
-                if "emotions" in sentiment_results and any(sentiment_results["emotions"].values()):
-                    emotions = sentiment_results["emotions"]
-                    st.write("Emotional breakdown:")
-                    cols = st.columns(3)
-                    for i, (emotion, score) in enumerate(sorted(emotions.items(), key=lambda x: x[1], reverse=True)):
-                        if score > 0.1:  # Only show significant emotions
-                            with cols[i % 3]:
-                                st.progress(score, text=f"{emotion.capitalize()}: {score:.2f}")
-                
-                # Display response
-                st.markdown("### Your personalized response:")
-                st.markdown(f"> *{response}*")
-                
-                # Display coping strategy if available
-                if strategy:
-                    st.markdown("### Suggested strategy:")
-                    st.markdown(f"💡 *{strategy}*")
             else:
                 st.error("Please write something before saving.")
+        
+        # Analysis results for the most recently saved entry
+        if st.session_state.get("last_saved_id"):
+            analysis_panel(st.session_state.last_saved_id)
     
     with col2:
         st.markdown("### Journaling Tips")
@@ -153,83 +291,63 @@ with tab1:
 with tab2:
     st.header("Your Journal History")
     
-    if not st.session_state.entries:
-        st.info("No entries yet. Start journaling in the 'Journal Entry' tab!")
-    else:
-        # Create a DataFrame for analysis
-        df = pd.DataFrame(st.session_state.entries)
-        df['date'] = pd.to_datetime(df['date'])
+    with st.expander("Import entries from another journal"):
+        import_panel()
+    
+    # Background writers (analysis results, imports, other sessions) wait
+    # while the History tab reads the shared repository
+    with journal.reading():
+        repository = journal.repository
+
+        if not len(repository):
+            st.info("No entries yet. Start journaling in the 'Journal Entry' tab!")
+        else:
+            aggregates = repository.aggregates
         
-        # Data summary
-        total_entries = len(df)
-        avg_sentiment = df['sentiment_score'].mean()
+            # Data summary, maintained incrementally by the repository
+            with metrics.stage("history.summary"):
+                total_entries = len(repository)
+                avg_sentiment = aggregates.average_score()
         
-        # Calculate sentiment trend safely
-        if len(df) >= 4:  # Need at least 4 entries to compare trends
-            sentiment_trend = "positive" if df['sentiment_score'].iloc[-3:].mean() > df['sentiment_score'].iloc[:-3].mean() else "negative"
-        elif len(df) >= 2:  # If we have 2-3 entries, compare the latest to the first
-            sentiment_trend = "positive" if df['sentiment_score'].iloc[-1] > df['sentiment_score'].iloc[0] else "negative"
-        else:  # Only one entry
-            sentiment_trend = "neutral"
+                # Calculate sentiment trend safely
+                scored_entries = aggregates.total.count
+                if scored_entries >= 4:  # Need at least 4 entries to compare trends
+                    recent_sum = sum(e['sentiment_score'] for e in repository.query(labels=SENTIMENT_LABELS,
+                                                                                    newest_first=True, limit=3))
+                    earlier_mean = (aggregates.total.score_sum - recent_sum) / (scored_entries - 3)
+                    sentiment_trend = "positive" if recent_sum / 3 > earlier_mean else "negative"
+                elif scored_entries >= 2:  # If we have 2-3 entries, compare the latest to the first
+                    latest, = repository.query(labels=SENTIMENT_LABELS, newest_first=True, limit=1)
+                    earliest, = repository.query(labels=SENTIMENT_LABELS, limit=1)
+                    sentiment_trend = "positive" if latest['sentiment_score'] > earliest['sentiment_score'] else "negative"
+                else:  # Only one entry
+                    sentiment_trend = "neutral"
         
-        # Display summary metrics
-        col1, col2, col3 = st.columns(3)
-        col1.metric("Total Entries", total_entries)
-        col2.metric("Average Mood", f"{avg_sentiment:.2f}")
-        col3.metric("Recent Trend", "Improving" if sentiment_trend == "positive" else "Declining")
+            # Display summary metrics
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Total Entries", total_entries)
+            col2.metric("Average Mood", f"{avg_sentiment:.2f}")
+            col3.metric("Recent Trend", "Improving" if sentiment_trend == "positive" else "Declining")
         
-        # Time filter
-        time_filter = st.radio("Time Range", ["All Time", "Last Week", "Last Month"], horizontal=True)
-        if time_filter == "Last Week":
-            df = df[df['date'] >= (pd.Timestamp.now() - pd.Timedelta(days=7))]
-        elif time_filter == "Last Month":
-            df = df[df['date'] >= (pd.Timestamp.now() - pd.Timedelta(days=30))]
+            # Time filter
+            time_filter = st.radio("Time Range", ["All Time", "Last Week", "Last Month"], horizontal=True)
+            start_date = time_filter_start(time_filter)
         
-        if len(df) > 0:
-            # Show sentiment trend chart
-            st.subheader("Mood Trends")
-            fig = px.line(df, x='date', y='sentiment_score', 
-                        title='Your Mood Over Time',
-                        labels={'sentiment_score': 'Mood Score', 'date': 'Date'})
+            if repository.count(start=start_date) > 0:
+                # Show sentiment trend chart
+                st.subheader("Mood Trends")
+                chart_mode = st.radio("Chart detail", CHART_MODES, horizontal=True)
+                with metrics.stage("history.chart"):
+                    fig = mood_figure(repository.version, start_date, chart_mode, repository)
+                st.plotly_chart(fig, use_container_width=True)
             
-            # Add a trend line
-            if len(df) >= 3:  # Need at least 3 points for a meaningful trendline
-                try:
-                    x = range(len(df))
-                    y = df['sentiment_score'].values
-                    coefficients = np.polyfit(x, y, 1)
-                    trendline = np.poly1d(coefficients)
-                    fig.add_trace(go.Scatter(x=df['date'], y=trendline(x),
-                                        mode='lines', name='Trend',
-                                        line=dict(color='rgba(255, 0, 0, 0.5)', width=2, dash='dash')))
-                except Exception as e:
-                    st.warning(f"Could not generate trend line: {e}")
-            
-            fig.update_layout(xaxis_title="Date", yaxis_title="Mood Score")
-            st.plotly_chart(fig, use_container_width=True)
-            
-            # Show emotion distribution if we have emotion data
-            if 'emotions' in df.columns and df['emotions'].apply(lambda x: isinstance(x, dict) and len(x) > 0).any():
-                st.subheader("Emotion Distribution")
-                
-                # Extract and aggregate emotions
-                emotion_data = {}
-                for entry in df.itertuples():
-                    if hasattr(entry, 'emotions') and isinstance(entry.emotions, dict):
-                        for emotion, score in entry.emotions.items():
-                            if emotion not in emotion_data:
-                                emotion_data[emotion] = []
-                            if isinstance(score, (int, float)):  # Ensure score is numeric
-                                emotion_data[emotion].append(score)
-                
-                # Calculate average scores for each emotion
-                emotion_avgs = {}
-                for k, v in emotion_data.items():
-                    if v:  # Only calculate if we have values
-                        emotion_avgs[k] = sum(v)/len(v)
+                # Show emotion distribution if we have emotion data
+                with metrics.stage("history.emotions"):
+                    emotion_avgs = aggregates.emotion_averages(start_date)
+                if emotion_avgs:
+                    st.subheader("Emotion Distribution")
                 
-                # Create bar chart for emotions
-                if emotion_avgs:  # Only create chart if we have data
+                    # Create bar chart for emotions
                     fig = px.bar(
                         x=list(emotion_avgs.keys()),
                         y=list(emotion_avgs.values()),
@@ -239,46 +357,96 @@ with tab2:
                         color_continuous_scale=px.colors.sequential.Viridis
                     )
                     st.plotly_chart(fig, use_container_width=True)
-                else:
-                    st.info("Not enough emotion data to display yet.")
             
-            # Entry history
-            st.subheader("Previous Entries")
+                # Per-entry scores, read from the memory-mapped columnar snapshot
+                if journal.snapshot is not None and st.toggle("Show entry data table", key="show_data_table"):
+                    with metrics.stage("history.data_table"):
+                        data_table = journal.analytics(start_date)
+                    st.dataframe(data_table, use_container_width=True, hide_index=True)
+            
+                # Entry history
+                st.subheader("Previous Entries")
+            
+                # Filter option
+                sentiment_filter = st.multiselect("Filter by sentiment", 
+                                                options=SENTIMENT_LABELS,
+                                                default=SENTIMENT_LABELS)
             
-            # Filter option
-            sentiment_filter = st.multiselect("Filter by sentiment", 
-                                            options=["Positive", "Neutral", "Negative"],
-                                            default=["Positive", "Neutral", "Negative"])
+                search_query = st.text_input("Search entries", placeholder='Keywords or "an exact phrase"').strip()
             
-            filtered_entries = [e for e in st.session_state.entries 
-                                if pd.to_datetime(e['date']) in df['date'].values 
-                                and e['sentiment'] in sentiment_filter]
+                # Entries still being analyzed are always listed
+                history_labels = sentiment_filter + [PENDING_LABEL]
             
-            for i, entry in enumerate(sorted(filtered_entries, 
-                                            key=lambda x: x['date'], 
-                                            reverse=True)):
-                with st.expander(f"{entry['date']} - {entry['sentiment']}"):
-                    st.write(entry['text'])
+                # Pagination; only the current page of entries is fetched
+                if search_query:
+                    with metrics.stage("history.search"):
+                        search_results = search_index.search(
+                            search_query,
+                            candidates=lambda entry_id: repository.matches(entry_id, start_date, history_labels))
+                    total_filtered = len(search_results)
+                    if not search_results:
+                        st.info("No entries match your search.")
+                else:
+                    total_filtered = repository.count(start=start_date, labels=history_labels)
+                page_count = max(1, -(-total_filtered // st.session_state.get("history_page_size", PAGE_SIZES[0])))
+                if st.session_state.get("history_page", 1) > page_count:
+                    st.session_state.history_page = page_count
+            
+                col1, col2 = st.columns(2)
+                page_size = col1.selectbox("Entries per page", PAGE_SIZES, key="history_page_size")
+                page = col2.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count,
+                                         step=1, key="history_page")
+            
+                offset = (page - 1) * page_size
+                with metrics.stage("history.page"):
+                    if search_query:
+                        page_entries = [repository.get(entry_id)
+                                        for entry_id, _ in search_results[offset:offset + page_size]]
+                    else:
+                        page_entries = repository.query(start=start_date,
+                                                        labels=history_labels,
+                                                        newest_first=True,
+                                                        offset=offset,
+                                                        limit=page_size)
+            
+                for entry in page_entries:
+                    entry_id = entry["id"]
+                
+                    # Entry bodies are only rendered once opened
+                    if not st.toggle(f"{entry['date']} - {entry['sentiment']}", key=f"open_{entry_id}"):
+                        continue
+                
+                    with st.container(border=True):
+                        st.write(entry['text'])
+                    
+                        if entry.get("status") == "pending":
+                            if analysis_queue.status(entry_id) == "failed":
+                                st.caption("We couldn't analyze this entry.")
+                                if st.button("Retry analysis", key=f"retry_{entry_id}"):
+                                    analysis_queue.retry(entry_id)
+                                    st.rerun()
+                            else:
+                                st.caption("Analysis in progress...")
                     
-                    # Display emotions if available
-                    if "emotions" in entry and any(entry["emotions"].values()):
-                        emotions_sorted = sorted(entry["emotions"].items(), key=lambda x: x[1], reverse=True)
-                        top_emotions = [f"{emotion.capitalize()}: {score:.2f}" 
-                                        for emotion, score in emotions_sorted[:3] 
-                                        if score > 0.1]
-                        if top_emotions:
-                            st.caption(f"Top emotions: {', '.join(top_emotions)}")
+                        # Display emotions if available
+                        if "emotions" in entry and any(entry["emotions"].values()):
+                            emotions_sorted = sorted(entry["emotions"].items(), key=lambda x: x[1], reverse=True)
+                            top_emotions = [f"{emotion.capitalize()}: {score:.2f}" 
+                                            for emotion, score in emotions_sorted[:3] 
+                                            if score > 0.1]
+                            if top_emotions:
+                                st.caption(f"Top emotions: {', '.join(top_emotions)}")
                     
-                    st.markdown(f"**Response:** *{entry['response']}*")
+                        if entry.get("response"):
+                            st.markdown(f"**Response:** *{entry['response']}*")
                     
-                    if "strategy" in entry and entry["strategy"]:
-                        st.markdown(f"**Suggested strategy:** *{entry['strategy']}*")
+                        if "strategy" in entry and entry["strategy"]:
+                            st.markdown(f"**Suggested strategy:** *{entry['strategy']}*")
                     
-                    # Option to delete entry
-                    if st.button("Delete Entry", key=f"delete_{i}"):
-                        st.session_state.entries.remove(entry)
-                        save_entries(st.session_state.entries)
-                        st.experimental_rerun()
+                        # Option to delete entry
+                        if st.button("Delete Entry", key=f"delete_{entry_id}"):
+                            delete_entry(entry_id)
+                            st.rerun()
 
 # About Tab
 with tab3:
@@ -318,6 +486,46 @@ with tab3:
     - **Data Visualization**: For tracking mood trends over time
     """)
 
+# Diagnostics Tab
+profile_output = None
+if show_diagnostics:
+    with diagnostics_tab[0]:
+        st.header("Diagnostics")
+        
+        st.subheader("Stage latency")
+        snapshot = metrics.snapshot()
+        if snapshot:
+            st.dataframe(
+                [{"stage": name, **{k: round(v, 2) for k, v in summary.items()}}
+                 for name, summary in snapshot.items()],
+                use_container_width=True,
+            )
+            st.download_button("Download JSON", json.dumps(snapshot, indent=2),
+                               file_name="journal_metrics.json", mime="application/json")
+        else:
+            st.info("No timings recorded yet.")
+        
+        if st.session_state.get("last_rerun_timings"):
+            st.subheader("Previous rerun")
+            st.json({stage: f"{seconds * 1000:.2f} ms"
+                     for stage, seconds in st.session_state.last_rerun_timings.items()})
+        
+        if sentiment_analyzer.cache is not None:
+            st.subheader("Analysis cache")
+            st.json(sentiment_analyzer.cache.stats())
+        
+        st.subheader("Live preview sentence cache")
+        st.json({"hits": sentence_preview.hits, "misses": sentence_preview.misses,
+                 "size": len(sentence_preview._sentences), "max_size": sentence_preview.max_sentences})
+        
+        st.subheader("Profiler")
+        if st.button("Profile next rerun"):
+            st.session_state.profile_next_rerun = True
+            st.rerun()
+        profile_output = st.empty()
+        if st.session_state.get("last_profile"):
+            profile_output.code(st.session_state.last_profile)
+
 # Sidebar
 st.sidebar.header("Mental Health Journal")
 st.sidebar.image("https://img.icons8.com/fluency/96/000000/journal.png", width=100)
@@ -343,4 +551,16 @@ st.sidebar.markdown("""
 
 # Display disclaimer at the bottom
 st.sidebar.markdown("---")
-st.sidebar.caption("This application is for educational purposes only and not intended as a medical device.") 
\ No newline at end of file
+st.sidebar.caption("This application is for educational purposes only and not intended as a medical device.") 
+
+# Finish timing and profiling for this script run
+rerun_timings = metrics.end_rerun()
+if rerun_timings is not None:
+    st.session_state.last_rerun_timings = rerun_timings
+if profiler is not None:
+    profiler.disable()
+    report = io.StringIO()
+    pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(30)
+    st.session_state.last_profile = report.getvalue()
+    if profile_output is not None:
+        profile_output.code(st.session_state.last_profile)
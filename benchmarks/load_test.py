@@ -0,0 +1,190 @@
+"""
+Load test for the local analysis service (service.py).
+
+Opens --concurrency keep-alive connections and sends --requests requests
+in total, each with one synthetic journal entry. Reports throughput,
+p50/p95/p99 latency of successful requests, how many were turned away
+with 503, and the average analyze_batch size the server reached.
+
+Usage:
+    python benchmarks/load_test.py [--endpoint analyze|respond]
+                                   [--concurrency 64] [--requests 5000]
+                                   [--port 8765 | --spawn]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from synthetic import generate_text
+
+
+class Connection:
+    """
+    Minimal HTTP/1.1 keep-alive client; enough for JSON requests to the service
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+
+    async def request(self, method, path, body=None):
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode("utf-8") if body is not None else b""
+        self._writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n".encode() + payload)
+        await self._writer.drain()
+
+        status = int((await self._reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        data = await self._reader.readexactly(length)
+        return status, json.loads(data) if data else None
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            await self._writer.wait_closed()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return round(sorted_values[index] * 1000, 2)
+
+
+async def health(host, port):
+    # A fresh connection: an idle one may have hit the server's keep-alive timeout
+    connection = Connection(host, port)
+    try:
+        _, body = await connection.request("GET", "/health")
+    finally:
+        await connection.close()
+    return body
+
+
+async def run(host, port, endpoint, concurrency, total, texts):
+    latencies, statuses = [], {}
+    remaining = iter(range(total))
+
+    async def client():
+        connection = Connection(host, port)
+        try:
+            for i in remaining:
+                start = time.perf_counter()
+                try:
+                    status, _ = await connection.request("POST", f"/{endpoint}", {"text": texts[i % len(texts)]})
+                except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+                    status = "error"
+                    await connection.close()
+                    connection = Connection(host, port)
+                if status == 200:
+                    latencies.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+        finally:
+            await connection.close()
+
+    before = await health(host, port)
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    after = await health(host, port)
+
+    latencies.sort()
+    batches = after["batches"] - before["batches"]
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": total,
+        "ok": statuses.get(200, 0),
+        "rejected_503": statuses.get(503, 0),
+        "errors": total - statuses.get(200, 0) - statuses.get(503, 0),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(statuses.get(200, 0) / elapsed, 1),
+        "latency_ms": {
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "mean": round(statistics.mean(latencies) * 1000, 2) if latencies else None,
+        },
+        # Server-side counters of the worker that answered /health
+        "mean_batch_size": round((after["texts"] - before["texts"]) / batches, 1) if batches else None,
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_service(port, workers):
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(REPO_ROOT, "service.py"), "--port", str(port), "--workers", str(workers)],
+        cwd=REPO_ROOT,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit("service.py exited during startup")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    sys.exit("service.py did not start listening within 30s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="port of a running service")
+    parser.add_argument("--spawn", action="store_true", help="start service.py on a free port for the run")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes when spawning")
+    parser.add_argument("--endpoint", choices=["analyze", "respond"], default="analyze")
+    parser.add_argument("--concurrency", type=int, default=64, help="simultaneous connections")
+    parser.add_argument("--requests", type=int, default=5000, help="requests in total")
+    parser.add_argument("--distinct-texts", type=int, default=5000,
+                        help="synthetic texts to cycle through (fewer means more analysis cache hits)")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    texts = [generate_text(rng) for _ in range(args.distinct_texts)]
+
+    process = None
+    port = args.port
+    if args.spawn:
+        port = free_port()
+        process = spawn_service(port, args.workers)
+    try:
+        results = asyncio.run(run(args.host, port, args.endpoint, args.concurrency, args.requests, texts))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
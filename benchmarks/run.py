@@ -0,0 +1,185 @@
+"""
+Benchmark suite over synthetic journals of increasing size.
+
+For each journal size this times analyzer throughput, journal store
+load/save, History tab data preparation and peak memory, and writes the
+results as JSON. Pass --baseline to compare against a previous run; any
+metric slower than the baseline by more than --threshold is reported and
+the script exits with status 1.
+
+Usage:
+    python benchmarks/run.py [--sizes 1000,10000,100000] [--output results.json]
+                             [--baseline baseline.json] [--threshold 0.2]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from synthetic import generate_entries
+from sentiment_analyzer import SentimentAnalyzer
+from journal_store import JsonlJournalStore
+from entry_repository import EntryRepository
+from chart_data import mood_series
+
+# Texts analyzed per size; analysis cost is per entry so a sample is enough
+ANALYZE_SAMPLE = 2000
+
+
+def timeit(fn, repeat=3):
+    """
+    Best wall time of fn over repeat runs, in seconds, plus its last result
+    """
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def peak_memory_mb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def bench_analysis(entries):
+    analyzer = SentimentAnalyzer()
+    analyzer.analyze_text("warm up")
+    texts = [entry["text"] for entry in entries[:ANALYZE_SAMPLE]]
+
+    single, _ = timeit(lambda: [analyzer.analyze_text(text) for text in texts], repeat=1)
+    batch, _ = timeit(lambda: analyzer.analyze_batch(texts), repeat=1)
+    return {
+        "analyze_text_per_sec": len(texts) / single,
+        "analyze_batch_per_sec": len(texts) / batch,
+    }
+
+
+def bench_store(entries, directory):
+    path = os.path.join(directory, "journal.jsonl")
+    store = JsonlJournalStore(path, legacy_path=None, compact_interval=0)
+
+    bulk_write, _ = timeit(lambda: store.rewrite(entries), repeat=1)
+    load, _ = timeit(store.load)
+    extra = dict(entries[-1], id="benchmark-extra")
+    append, _ = timeit(lambda: store.append(dict(extra)), repeat=5)
+    delete, _ = timeit(lambda: store.delete("benchmark-extra"), repeat=5)
+    compact, _ = timeit(store.compact, repeat=1)
+    return {
+        "store_rewrite_s": bulk_write,
+        "store_load_s": load,
+        "store_append_s": append,
+        "store_delete_s": delete,
+        "store_compact_s": compact,
+        "store_file_mb": os.path.getsize(path) / 2 ** 20,
+        "store_load_peak_mb": peak_memory_mb(store.load),
+    }
+
+
+def bench_history(entries):
+    repository_build, repository = timeit(lambda: EntryRepository(entries))
+    end = datetime.date.fromisoformat(entries[-1]["date"])
+    last_month = end - datetime.timedelta(days=29)
+
+    dataframe_build, _ = timeit(repository.to_dataframe)
+    filter_query, _ = timeit(lambda: repository.query(start=last_month, labels=["Negative", "Neutral"],
+                                                      newest_first=True, limit=10))
+    emotion_averages, _ = timeit(lambda: (repository.aggregates.emotion_averages(),
+                                          repository.aggregates.emotion_averages(last_month)))
+    trendline, _ = timeit(lambda: (repository.aggregates.trendline(),
+                                   repository.aggregates.trendline(last_month)))
+    chart_series, _ = timeit(lambda: mood_series(repository))
+    return {
+        "repository_build_s": repository_build,
+        "dataframe_build_s": dataframe_build,
+        "filter_query_s": filter_query,
+        "emotion_averages_s": emotion_averages,
+        "trendline_s": trendline,
+        "chart_series_s": chart_series,
+        "repository_peak_mb": peak_memory_mb(lambda: EntryRepository(entries)),
+    }
+
+
+def run(sizes):
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        },
+        "sizes": {},
+    }
+    for size in sizes:
+        print(f"Benchmarking {size} entries...", file=sys.stderr)
+        entries = generate_entries(size)
+        with tempfile.TemporaryDirectory() as directory:
+            metrics = {}
+            metrics.update(bench_analysis(entries))
+            metrics.update(bench_store(entries, directory))
+            metrics.update(bench_history(entries))
+        results["sizes"][str(size)] = metrics
+    return results
+
+
+def higher_is_better(metric):
+    return metric.endswith("_per_sec")
+
+
+def compare(results, baseline, threshold):
+    """
+    Return a list of human-readable regressions against baseline
+    """
+    regressions = []
+    for size, metrics in results["sizes"].items():
+        for metric, value in metrics.items():
+            old = baseline.get("sizes", {}).get(size, {}).get(metric)
+            if not old:
+                continue
+            change = (old - value) / old if higher_is_better(metric) else (value - old) / old
+            if change > threshold:
+                regressions.append(f"{size} entries: {metric} {old:.4g} -> {value:.4g} ({change:+.0%} worse)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the journal benchmark suite.")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated journal sizes")
+    parser.add_argument("--output", default="benchmark_results.json", help="where to write results")
+    parser.add_argument("--baseline", help="previous results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown before a metric counts as a regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = run(sizes)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Cold-start benchmark: import time plus time to the first analysis.
+
+Each sample runs in a fresh interpreter so nothing is shared between runs.
+Compares the stock NLTK analyzer (which re-parses the lexicon text file)
+against our analyzer loading the pre-parsed lexicon snapshot.
+
+Usage:
+    python benchmarks/startup.py [--runs N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_TEXT = "Today I felt anxious about work, but a walk with a friend made me happy."
+
+STOCK_NLTK = f"""
+import time
+t0 = time.perf_counter()
+from nltk.sentiment import SentimentIntensityAnalyzer
+t1 = time.perf_counter()
+SentimentIntensityAnalyzer().polarity_scores({SAMPLE_TEXT!r})
+t2 = time.perf_counter()
+print(t1 - t0, t2 - t1)
+"""
+
+SNAPSHOT = f"""
+import time
+t0 = time.perf_counter()
+from sentiment_analyzer import get_sentiment_analyzer
+t1 = time.perf_counter()
+get_sentiment_analyzer().analyze_text({SAMPLE_TEXT!r})
+t2 = time.perf_counter()
+print(t1 - t0, t2 - t1)
+"""
+
+
+def sample(code):
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+    return float(output[-2]), float(output[-1])
+
+
+def measure(code, runs):
+    imports, firsts = [], []
+    for _ in range(runs):
+        import_time, first_time = sample(code)
+        imports.append(import_time)
+        firsts.append(first_time)
+    return {
+        "import_ms": round(statistics.median(imports) * 1000, 2),
+        "first_analysis_ms": round(statistics.median(firsts) * 1000, 2),
+        "total_ms": round(statistics.median(i + f for i, f in zip(imports, firsts)) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per variant")
+    args = parser.parse_args()
+
+    # Warm the OS file cache and make sure the snapshot exists
+    sample(SNAPSHOT)
+
+    results = {
+        "stock_nltk": measure(STOCK_NLTK, args.runs),
+        "snapshot": measure(SNAPSHOT, args.runs),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Seeded synthetic journal generator for benchmarks.
+
+Entries look like real journal text: lengths follow a log-normal
+distribution (most entries are a short paragraph, a few run to several
+hundred words), roughly one sentence in four mentions an emotion keyword,
+and dates are spread over consecutive days with occasional gaps and
+multiple entries per day. The analysis fields are filled with plausible
+values so storage and History tab benchmarks don't need to run the
+analyzer first.
+"""
+import datetime
+import random
+from emotion_lexicon import DEFAULT_EMOTION_KEYWORDS
+
+FILLER_WORDS = (
+    "today work morning evening friend family walk coffee meeting call dinner "
+    "sleep weekend project email home commute lunch run read movie rain sun "
+    "kids partner team plan week time felt thought went talked made had really "
+    "little bit long day night again still maybe better tired busy quiet"
+).split()
+
+RESPONSES = [
+    "Thank you for sharing your thoughts today.",
+    "It's wonderful to hear you're feeling good!",
+    "I hear that you're going through a difficult time.",
+]
+
+
+def _sentence(rng):
+    words = [rng.choice(FILLER_WORDS) for _ in range(rng.randint(6, 16))]
+    if rng.random() < 0.25:
+        emotion = rng.choice(list(DEFAULT_EMOTION_KEYWORDS))
+        words.insert(rng.randrange(len(words)), rng.choice(DEFAULT_EMOTION_KEYWORDS[emotion]))
+    words[0] = words[0].capitalize()
+    return " ".join(words) + rng.choice([".", ".", ".", "!", "?"])
+
+
+def generate_text(rng):
+    target_words = max(8, int(rng.lognormvariate(4.6, 0.6)))  # median ~100 words
+    sentences = []
+    words = 0
+    while words < target_words:
+        sentence = _sentence(rng)
+        sentences.append(sentence)
+        words += sentence.count(" ") + 1
+    return " ".join(sentences)
+
+
+def generate_entries(count, seed=42, end_date=None):
+    """
+    Return count synthetic journal entries, oldest first
+    """
+    rng = random.Random(seed)
+    end_date = end_date or datetime.date(2026, 1, 1)
+    date = end_date - datetime.timedelta(days=int(count * 0.9))
+    entries = []
+    for i in range(count):
+        # Mostly one entry per day, sometimes a skipped day or a second entry
+        step = rng.choices([0, 1, 2], weights=[0.15, 0.75, 0.10])[0]
+        date += datetime.timedelta(days=step)
+        score = max(-1.0, min(1.0, rng.gauss(0.1, 0.5)))
+        label = "Positive" if score >= 0.05 else "Negative" if score <= -0.05 else "Neutral"
+        entries.append({
+            "id": f"{seed:04d}{i:08d}",
+            "date": date.strftime("%Y-%m-%d"),
+            "text": generate_text(rng),
+            "sentiment": label,
+            "sentiment_score": round(score, 4),
+            "emotions": {emotion: round(rng.random() * 0.6, 4) for emotion in DEFAULT_EMOTION_KEYWORDS},
+            "response": rng.choice(RESPONSES),
+            "strategy": None,
+        })
+    return entries
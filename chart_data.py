@@ -0,0 +1,100 @@
+import datetime
+import numpy as np
+import plotly.graph_objects as go
+from aggregates import TREND_ORIGIN
+
+# Upper bound on points sent to the browser for the mood chart
+MAX_CHART_POINTS = 500
+
+CHART_MODES = ["Entries", "Daily Average", "Weekly Average"]
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+    Keeps the first and last points and, from each bucket in between, the
+    point forming the largest triangle with its neighbours, which preserves
+    the visual shape of the series far better than plain decimation.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+
+    previous = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket is the third triangle vertex
+        next_lo, next_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[next_lo:next_hi].mean()
+        next_y = y[next_lo:next_hi].mean()
+
+        areas = np.abs((x[previous] - next_x) * (y[lo:hi] - y[previous])
+                       - (x[previous] - x[lo:hi]) * (next_y - y[previous]))
+        previous = lo + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return selected
+
+
+def _rollup_series(rollups, start_ordinal):
+    points = [(ordinal, rollup.score_sum / rollup.count)
+              for ordinal, rollup in sorted(rollups.items())
+              if start_ordinal is None or ordinal >= start_ordinal]
+    ordinals = np.array([p[0] for p in points], dtype=np.float64)
+    scores = np.array([p[1] for p in points], dtype=np.float64)
+    return ordinals, scores
+
+
+def mood_series(repository, start=None, mode="Entries", max_points=MAX_CHART_POINTS):
+    """
+    Return (dates, scores) for the mood chart, bounded to max_points.
+    Daily and weekly modes read the pre-built aggregate rollups.
+    """
+    aggregates = repository.aggregates
+    if mode == "Daily Average":
+        start_ordinal = start.toordinal() if start else None
+        ordinals, scores = _rollup_series(aggregates.days, start_ordinal)
+    elif mode == "Weekly Average":
+        start_week = (start - datetime.timedelta(days=start.weekday())).toordinal() if start else None
+        ordinals, scores = _rollup_series(aggregates.weeks, start_week)
+    else:
+        ordinals, scores = repository.scores_by_date(start)
+
+    if not len(ordinals):
+        return [], []
+    ordinals = np.asarray(ordinals, dtype=np.float64)
+
+    keep = lttb(ordinals, scores, max_points)
+    dates = [datetime.date.fromordinal(int(o)) for o in ordinals[keep]]
+    return dates, scores[keep].tolist()
+
+
+def build_mood_figure(repository, start=None, mode="Entries", max_points=MAX_CHART_POINTS):
+    """
+    Build the "Your Mood Over Time" figure. The plotted series is bounded
+    to max_points; the trendline is fitted on every entry in the window.
+    """
+    dates, scores = mood_series(repository, start, mode, max_points)
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=dates, y=scores, mode='lines', name='Mood',
+                             hovertemplate='Date=%{x}<br>Mood Score=%{y:.2f}<extra></extra>'))
+
+    # Need at least 3 entries for a meaningful trendline; a line only needs its endpoints
+    trend = repository.aggregates.trendline(start)
+    if trend is not None and repository.aggregates.window(start).count >= 3 and dates:
+        slope, intercept = trend
+        ends = [dates[0], dates[-1]]
+        fig.add_trace(go.Scatter(x=ends,
+                                 y=[intercept + slope * (d.toordinal() - TREND_ORIGIN) for d in ends],
+                                 mode='lines', name='Trend',
+                                 line=dict(color='rgba(255, 0, 0, 0.5)', width=2, dash='dash')))
+
+    fig.update_layout(title='Your Mood Over Time', xaxis_title="Date", yaxis_title="Mood Score",
+                      showlegend=False)
+    return fig
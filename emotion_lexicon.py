@@ -0,0 +1,120 @@
+import json
+import re
+
+# Emotion keywords (simple implementation)
+DEFAULT_EMOTION_KEYWORDS = {
+    "joy": ["happy", "joy", "delighted", "pleasure", "excited", "glad", "smile"],
+    "sadness": ["sad", "unhappy", "depressed", "down", "miserable", "gloomy", "tearful"],
+    "anger": ["angry", "mad", "furious", "outraged", "annoyed", "irritated", "frustrated"],
+    "fear": ["afraid", "scared", "terrified", "anxious", "worried", "nervous", "panic"],
+    "surprise": ["surprised", "amazed", "astonished", "shocked", "unexpected"],
+    "disgust": ["disgusted", "revolted", "nauseated", "appalled", "repulsed"]
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)*")
+
+
+def tokenize(text):
+    """
+    Lowercase word tokens; keyword matching happens on whole words only
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class EmotionMatcher:
+    """
+    Keyword -> emotion lookup compiled once from an emotion lexicon.
+
+    A text is tokenized in a single pass and each token (or short phrase) is
+    looked up in a hash map, so matching costs O(len(text)) no matter how many
+    keywords the lexicon has. Matches respect word boundaries: "down" does
+    not match "downtown" and "mad" does not match "made".
+    """
+
+    def __init__(self, emotion_keywords=None):
+        if emotion_keywords is None:
+            emotion_keywords = DEFAULT_EMOTION_KEYWORDS
+        self.keywords = {emotion: list(keywords) for emotion, keywords in emotion_keywords.items()}
+        self.emotions = list(emotion_keywords)
+        self._emotion_index = {emotion: i for i, emotion in enumerate(self.emotions)}
+
+        # Single words are keyed by the word itself, phrases by a token tuple.
+        # Each maps to (keyword id, emotion indexes).
+        self._keywords = {}
+        self.max_phrase_length = 1
+        for emotion, keywords in emotion_keywords.items():
+            for keyword in keywords:
+                phrase = tuple(tokenize(keyword))
+                if not phrase:
+                    continue
+                key = phrase[0] if len(phrase) == 1 else phrase
+                keyword_id, indexes = self._keywords.get(key, (len(self._keywords), ()))
+                self._keywords[key] = (keyword_id, indexes + (self._emotion_index[emotion],))
+                self.max_phrase_length = max(self.max_phrase_length, len(phrase))
+        # Emotion indexes by keyword id
+        self._keyword_emotions = [()] * len(self._keywords)
+        for keyword_id, indexes in self._keywords.values():
+            self._keyword_emotions[keyword_id] = indexes
+
+    @classmethod
+    def from_file(cls, path, extend=True):
+        """
+        Load a JSON lexicon of the form {"emotion": ["keyword", ...], ...}.
+        With extend=True the keywords are added to the default lexicon,
+        otherwise they replace it.
+        """
+        with open(path, "r") as f:
+            custom = json.load(f)
+
+        if not extend:
+            return cls(custom)
+
+        merged = {emotion: list(keywords) for emotion, keywords in DEFAULT_EMOTION_KEYWORDS.items()}
+        for emotion, keywords in custom.items():
+            merged.setdefault(emotion, [])
+            merged[emotion].extend(k for k in keywords if k not in merged[emotion])
+        return cls(merged)
+
+    def match_tokens(self, tokens):
+        """
+        Return the set of distinct keyword ids matched in a token list
+        """
+        seen = set()
+        keywords = self._keywords
+        max_len = self.max_phrase_length
+
+        for i, token in enumerate(tokens):
+            match = keywords.get(token)
+            for n in range(2, max_len + 1):
+                if match is not None and match[0] not in seen:
+                    break
+                if i + n > len(tokens):
+                    break
+                match = keywords.get(tuple(tokens[i:i + n]))
+            if match is None or match[0] in seen:
+                continue
+            seen.add(match[0])
+        return seen
+
+    def count_matches(self, keyword_ids):
+        """
+        Per-emotion counts for a set of matched keyword ids, aligned with self.emotions
+        """
+        counts = [0] * len(self.emotions)
+        for keyword_id in keyword_ids:
+            for emotion_index in self._keyword_emotions[keyword_id]:
+                counts[emotion_index] += 1
+        return counts
+
+    def count_tokens(self, tokens):
+        """
+        Count distinct matched keywords per emotion for a token list.
+        Returns a list aligned with self.emotions.
+        """
+        return self.count_matches(self.match_tokens(tokens))
+
+    def count(self, text):
+        """
+        Count distinct matched keywords per emotion in text
+        """
+        return dict(zip(self.emotions, self.count_tokens(tokenize(text))))
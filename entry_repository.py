@@ -0,0 +1,370 @@
+import datetime
+import heapq
+import itertools
+import math
+import uuid
+from array import array
+from bisect import bisect_left, bisect_right
+import numpy as np
+import pandas as pd
+from aggregates import AggregateStore
+
+SENTIMENT_LABELS = ["Positive", "Neutral", "Negative"]
+
+# Rows allocated up front; columns double in size when full
+INITIAL_CAPACITY = 1024
+
+# Fields stored in columns; anything else on an entry is kept as-is
+_COLUMN_FIELDS = {"id", "date", "text", "sentiment", "sentiment_score", "emotions", "response", "strategy"}
+
+_UNIX_EPOCH = datetime.date(1970, 1, 1).toordinal()
+
+
+def date_to_ordinal(date_str):
+    """
+    Convert a stored YYYY-MM-DD date string to a proleptic Gregorian ordinal
+    """
+    return datetime.date.fromisoformat(date_str).toordinal()
+
+
+class _DateIndex:
+    """
+    Row numbers kept sorted by date ordinal in two parallel columns.
+    Ties keep insertion order.
+    """
+
+    def __init__(self):
+        self.ordinals = array('i')
+        self.rows = array('i')
+
+    def __len__(self):
+        return len(self.rows)
+
+    def insert(self, ordinal, row):
+        pos = bisect_right(self.ordinals, ordinal)
+        self.ordinals.insert(pos, ordinal)
+        self.rows.insert(pos, row)
+
+    def remove(self, ordinal, row):
+        lo = bisect_left(self.ordinals, ordinal)
+        hi = bisect_right(self.ordinals, ordinal)
+        pos = self.rows.index(row, lo, hi)
+        del self.ordinals[pos]
+        del self.rows[pos]
+
+    def iter_positions(self, positions):
+        ordinals, rows = self.ordinals, self.rows
+        for p in positions:
+            yield ordinals[p], rows[p]
+
+    def range(self, start=None, end=None):
+        """
+        Return the (lo, hi) slice of positions whose dates fall in [start, end]
+        """
+        lo = 0 if start is None else bisect_left(self.ordinals, start)
+        hi = len(self.rows) if end is None else bisect_right(self.ordinals, end)
+        return lo, hi
+
+
+class _StringTable:
+    """
+    Interned values addressed by small integer codes
+    """
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def code(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def _resized(column, capacity, fill):
+    grown = np.full((capacity,) + column.shape[1:], fill, dtype=column.dtype)
+    grown[:len(column)] = column
+    return grown
+
+
+class EntryRepository:
+    """
+    In-memory view of the journal optimised for the History tab.
+
+    Entries are stored column-wise rather than as one dict each: dates as
+    int32 ordinals, sentiment labels as int16 codes, scores as float64,
+    emotions as a float32 matrix (NaN where an entry has no value) and
+    responses/strategies as codes into a table of distinct phrases, since
+    those come from a small fixed set. Entry dicts are rebuilt on demand
+    for the rows a caller asks for.
+
+    A date-sorted index over all rows and one per sentiment label make a
+    "date range + labels" query a couple of binary searches plus a merge of
+    the matching slices: O(log n + k) instead of a scan over the whole
+    journal. Dashboard metrics are kept up to date alongside in an
+    AggregateStore.
+    """
+
+    def __init__(self, entries=()):
+        self._rows = {}
+        self._free = []
+        self._size = 0
+        self._ids = []
+        self._texts = []
+        self._extras = {}
+        self._ordinals = np.zeros(INITIAL_CAPACITY, dtype=np.int32)
+        self._labels = np.full(INITIAL_CAPACITY, -1, dtype=np.int16)
+        self._scores = np.full(INITIAL_CAPACITY, np.nan, dtype=np.float64)
+        self._emotions = np.full((INITIAL_CAPACITY, 0), np.nan, dtype=np.float32)
+        self._responses = np.full(INITIAL_CAPACITY, -1, dtype=np.int32)
+        self._strategies = np.full(INITIAL_CAPACITY, -1, dtype=np.int32)
+        self._label_table = _StringTable()
+        self._emotion_table = _StringTable()
+        self._phrase_table = _StringTable()
+
+        self._all = _DateIndex()
+        self._by_label = {}
+        for label in SENTIMENT_LABELS:
+            self._by_label[label] = _DateIndex()
+            self._label_table.code(label)
+        self.aggregates = AggregateStore()
+        # Changes on every add/remove; lets callers cache derived views
+        self.version = uuid.uuid4().hex
+        for entry in entries:
+            self.add(entry)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        # Insertion order, matching the order entries were saved in
+        return (self._entry(row) for row in list(self._rows.values()))
+
+    def __contains__(self, entry_id):
+        return entry_id in self._rows
+
+    def ids(self):
+        """
+        Entry ids in insertion order
+        """
+        return list(self._rows)
+
+    def get(self, entry_id):
+        row = self._rows.get(entry_id)
+        return self._entry(row) if row is not None else None
+
+    def _allocate(self):
+        if self._free:
+            return self._free.pop()
+        row = self._size
+        if row == len(self._ordinals):
+            capacity = 2 * len(self._ordinals)
+            self._ordinals = _resized(self._ordinals, capacity, 0)
+            self._labels = _resized(self._labels, capacity, -1)
+            self._scores = _resized(self._scores, capacity, np.nan)
+            self._emotions = _resized(self._emotions, capacity, np.nan)
+            self._responses = _resized(self._responses, capacity, -1)
+            self._strategies = _resized(self._strategies, capacity, -1)
+        self._size += 1
+        self._ids.append(None)
+        self._texts.append(None)
+        return row
+
+    def _emotion_column(self, emotion):
+        column = self._emotion_table.code(emotion)
+        if column == self._emotions.shape[1]:
+            extra = np.full((len(self._emotions), 1), np.nan, dtype=np.float32)
+            self._emotions = np.hstack([self._emotions, extra])
+        return column
+
+    def _entry(self, row):
+        """
+        Rebuild the entry dict stored in row
+        """
+        entry = {
+            "id": self._ids[row],
+            "date": datetime.date.fromordinal(int(self._ordinals[row])).isoformat(),
+            "text": self._texts[row],
+        }
+        label = self._labels[row]
+        if label >= 0:
+            entry["sentiment"] = self._label_table.values[label]
+        score = self._scores[row]
+        if not math.isnan(score):
+            entry["sentiment_score"] = float(score)
+        emotions = {name: round(float(value), 6)
+                    for name, value in zip(self._emotion_table.values, self._emotions[row])
+                    if not math.isnan(value)}
+        if emotions:
+            entry["emotions"] = emotions
+        for field, codes in (("response", self._responses), ("strategy", self._strategies)):
+            if codes[row] >= 0:
+                entry[field] = self._phrase_table.values[codes[row]]
+        entry.update(self._extras.get(row, ()))
+        return entry
+
+    def add(self, entry):
+        entry_id = entry["id"]
+        if entry_id in self._rows:
+            self.remove(entry_id)
+        ordinal = date_to_ordinal(entry["date"])
+        row = self._allocate()
+        self._rows[entry_id] = row
+        self._ids[row] = entry_id
+        self._texts[row] = entry["text"]
+        self._ordinals[row] = ordinal
+
+        extras = {field: value for field, value in entry.items() if field not in _COLUMN_FIELDS}
+        label = entry.get("sentiment")
+        if isinstance(label, str):
+            self._labels[row] = self._label_table.code(label)
+        elif "sentiment" in entry:
+            extras["sentiment"] = label
+        score = entry.get("sentiment_score")
+        if isinstance(score, (int, float)) and not isinstance(score, bool):
+            self._scores[row] = score
+        elif "sentiment_score" in entry:
+            extras["sentiment_score"] = score
+        emotions = entry.get("emotions")
+        stored = False
+        if isinstance(emotions, dict):
+            for emotion, value in emotions.items():
+                if isinstance(value, (int, float)):
+                    column = self._emotion_column(emotion)
+                    self._emotions[row, column] = value
+                    stored = True
+        if "emotions" in entry and not stored:
+            # Keep empty or malformed emotions exactly as given
+            extras["emotions"] = emotions
+        for field, codes in (("response", self._responses), ("strategy", self._strategies)):
+            if field in entry:
+                codes[row] = self._phrase_table.code(entry[field])
+        if extras:
+            self._extras[row] = extras
+
+        self._all.insert(ordinal, row)
+        if label not in self._by_label:
+            self._by_label[label] = _DateIndex()
+        self._by_label[label].insert(ordinal, row)
+        # Aggregate the values as stored (emotions rounded to float32), the
+        # same ones remove() will subtract, so updates don't leave drift
+        self.aggregates.add(self._entry(row), ordinal)
+        self.version = uuid.uuid4().hex
+
+    def remove(self, entry_id):
+        row = self._rows.pop(entry_id, None)
+        if row is None:
+            return None
+        entry = self._entry(row)
+        ordinal = int(self._ordinals[row])
+        self._all.remove(ordinal, row)
+        self._by_label[entry.get("sentiment")].remove(ordinal, row)
+        self.aggregates.remove(entry, ordinal)
+
+        self._ids[row] = None
+        self._texts[row] = None
+        self._extras.pop(row, None)
+        self._labels[row] = -1
+        self._scores[row] = np.nan
+        self._emotions[row] = np.nan
+        self._responses[row] = -1
+        self._strategies[row] = -1
+        self._free.append(row)
+        self.version = uuid.uuid4().hex
+        return entry
+
+    def matches(self, entry_id, start=None, labels=None):
+        """
+        Whether an entry is dated on or after start with a sentiment in labels
+        """
+        row = self._rows.get(entry_id)
+        if row is None:
+            return False
+        if labels is not None:
+            label = self._labels[row]
+            if (self._label_table.values[label] if label >= 0 else None) not in labels:
+                return False
+        return start is None or self._ordinals[row] >= start.toordinal()
+
+    def _indexes(self, labels):
+        if labels is None:
+            return [self._all]
+        return [self._by_label[label] for label in labels if label in self._by_label]
+
+    def _runs(self, start, end, labels, newest_first):
+        """
+        Lazily iterate (ordinal, row) pairs from each matching index slice
+        """
+        start = start.toordinal() if start is not None else None
+        end = end.toordinal() if end is not None else None
+
+        runs = []
+        for index in self._indexes(labels):
+            lo, hi = index.range(start, end)
+            if lo >= hi:
+                continue
+            positions = range(hi - 1, lo - 1, -1) if newest_first else range(lo, hi)
+            runs.append(index.iter_positions(positions))
+        return runs
+
+    def count(self, start=None, end=None, labels=None):
+        """
+        Number of entries dated within [start, end] with a sentiment in labels
+        """
+        start = start.toordinal() if start is not None else None
+        end = end.toordinal() if end is not None else None
+        total = 0
+        for index in self._indexes(labels):
+            lo, hi = index.range(start, end)
+            total += hi - lo
+        return total
+
+    def query(self, start=None, end=None, labels=None, newest_first=False,
+              offset=0, limit=None):
+        """
+        Return entries dated within [start, end] (datetime.date or None)
+        whose sentiment is in labels (all labels when None), sorted by date.
+        offset/limit select a page without touching entries outside it.
+        """
+        runs = self._runs(start, end, labels, newest_first)
+        if len(runs) == 1:
+            merged = runs[0]
+        elif newest_first:
+            merged = heapq.merge(*runs, key=lambda item: item[0], reverse=True)
+        else:
+            merged = heapq.merge(*runs, key=lambda item: item[0])
+
+        stop = None if limit is None else offset + limit
+        return [self._entry(row) for _, row in itertools.islice(merged, offset, stop)]
+
+    def scores_by_date(self, start=None, end=None):
+        """
+        Return (ordinals, scores) arrays for scored entries dated within
+        [start, end], sorted by date
+        """
+        lo, hi = self._all.range(start.toordinal() if start is not None else None,
+                                 end.toordinal() if end is not None else None)
+        rows = np.array(self._all.rows[lo:hi], dtype=np.intp)
+        scores = self._scores[rows]
+        scored = ~np.isnan(scores)
+        return self._ordinals[rows][scored], scores[scored]
+
+    def to_dataframe(self):
+        """
+        Entries as a DataFrame of id, date, sentiment, sentiment_score and
+        one column per emotion, in storage order. The score and emotion
+        columns are views over the repository's arrays unless entries have
+        been removed, so take a copy before modifying it.
+        """
+        n = self._size
+        frame = pd.DataFrame(self._emotions[:n], columns=list(self._emotion_table.values), copy=False)
+        frame.insert(0, "id", self._ids[:n])
+        frame.insert(1, "date", (self._ordinals[:n] - _UNIX_EPOCH).astype("datetime64[D]"))
+        frame.insert(2, "sentiment", pd.Categorical.from_codes(self._labels[:n],
+                                                               categories=self._label_table.values))
+        frame.insert(3, "sentiment_score", pd.Series(self._scores[:n], copy=False))
+        if self._free:
+            frame = frame[frame["id"].notna()]
+        return frame
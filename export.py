@@ -0,0 +1,92 @@
+"""
+Export a journal's analytics columns (date, sentiment, score and one column
+per emotion) for use in external tools.
+
+Rows are streamed from the journal's columnar snapshot in bounded batches,
+so memory use doesn't grow with the size of the journal. Entries still
+waiting for analysis are left out. Requires pyarrow.
+
+Usage:
+    python export.py --format csv|jsonl|parquet --output PATH
+                     [--user NAME] [--data-dir DIR] [--batch-rows 8192]
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from journal_store import JsonlJournalStore, JOURNAL_FILE
+from analytics_snapshot import AnalyticsSnapshot, SNAPSHOT_DIR, BATCH_ROWS, available
+from user_journal import DATA_DIR, DEFAULT_USER, user_directory
+
+FORMATS = ["csv", "jsonl", "parquet"]
+
+
+def _write_jsonl(batches, path):
+    rows = 0
+    with open(path, "w") as f:
+        for batch in batches:
+            for row in batch.to_pylist():
+                f.write(json.dumps(row, default=str) + "\n")
+            rows += batch.num_rows
+    return rows
+
+
+def _write_arrow(batches, path, writer_class, schema):
+    rows = 0
+    with writer_class(path, schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+def export_snapshot(snapshot, fmt, path, batch_rows=BATCH_ROWS):
+    """
+    Stream every live entry of snapshot to path; returns the row count
+    """
+    batches = snapshot.iter_batches(batch_rows)
+    if fmt == "jsonl":
+        return _write_jsonl(batches, path)
+
+    # Writers need the schema up front; take it from the first batch
+    first = next(batches, None)
+    if first is None:
+        schema = snapshot.schema()
+    else:
+        schema = first.schema
+        batches = itertools.chain([first], batches)
+
+    if fmt == "csv":
+        import pyarrow.csv
+        return _write_arrow(batches, path, pyarrow.csv.CSVWriter, schema)
+    import pyarrow.parquet
+    return _write_arrow(batches, path, pyarrow.parquet.ParquetWriter, schema)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export journal analytics as CSV, JSON Lines or Parquet.")
+    parser.add_argument("--format", choices=FORMATS, required=True, help="output format")
+    parser.add_argument("--output", required=True, help="file to write")
+    parser.add_argument("--user", default=DEFAULT_USER, help="whose journal to export")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="journal data directory")
+    parser.add_argument("--batch-rows", type=int, default=BATCH_ROWS, help="rows held in memory at once")
+    args = parser.parse_args()
+
+    if not available():
+        sys.exit("Exporting requires pyarrow: pip install pyarrow")
+
+    directory = user_directory(args.user, args.data_dir)
+    if not os.path.isdir(directory):
+        sys.exit(f"No journal for user {args.user!r} in {args.data_dir}")
+    store = JsonlJournalStore(os.path.join(directory, JOURNAL_FILE), legacy_path=None, compact_interval=0)
+    snapshot = AnalyticsSnapshot(store, os.path.join(directory, SNAPSHOT_DIR))
+
+    start = time.perf_counter()
+    rows = export_snapshot(snapshot, args.format, args.output, args.batch_rows)
+    print(f"Exported {rows} entries to {args.output} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Bulk import of journals exported from other tools.
+
+Entries are analyzed in a process pool: each worker builds its own
+SentimentAnalyzer and ResponseGenerator once (so VADER loads once per
+worker), entries are sent in chunks to keep IPC overhead low, and results
+come back in input order. The whole import runs on a background thread so
+the Streamlit UI stays responsive while it polls the job for progress.
+"""
+import datetime
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from journal_store import new_entry_id
+
+DEFAULT_CHUNK_SIZE = 250
+
+_analyzer = None
+_generator = None
+
+
+def _init_worker():
+    global _analyzer, _generator
+    from sentiment_analyzer import get_sentiment_analyzer
+    from response_generator import get_response_generator
+
+    _analyzer = get_sentiment_analyzer()
+    _generator = get_response_generator()
+
+
+def _analyze_chunk(chunk):
+    texts = [entry["text"] for entry in chunk]
+    results = _analyzer.analyze_batch(texts)
+    replies = _generator.generate_batch(texts, results)
+    analyzed = []
+    for entry, sentiment_results, (response, strategy) in zip(chunk, results, replies):
+        analyzed.append({
+            "id": entry["id"],
+            "date": entry["date"],
+            "text": entry["text"],
+            "sentiment": sentiment_results["label"],
+            "sentiment_score": sentiment_results["score"],
+            "emotions": sentiment_results["emotions"],
+            "response": response,
+            "strategy": strategy
+        })
+    return analyzed
+
+
+def parse_import_file(data):
+    """
+    Parse an uploaded journal: either a JSON array or JSON Lines of objects
+    with at least "date" and "text". Returns (entries, skipped_count).
+    """
+    if isinstance(data, bytes):
+        data = data.decode("utf-8")
+    data = data.strip()
+
+    if data.startswith("["):
+        raw_entries = json.loads(data)
+    else:
+        raw_entries = [json.loads(line) for line in data.splitlines() if line.strip()]
+
+    entries = []
+    skipped = 0
+    for raw in raw_entries:
+        try:
+            date = datetime.date.fromisoformat(str(raw["date"])[:10])
+            text = str(raw["text"])
+        except (KeyError, TypeError, ValueError):
+            skipped += 1
+            continue
+        if not text.strip():
+            skipped += 1
+            continue
+        entries.append({"id": new_entry_id(), "date": date.strftime("%Y-%m-%d"), "text": text})
+    return entries, skipped
+
+
+def analyze_entries(entries, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Analyze entries in a process pool and return them in input order
+    """
+    chunks = [entries[i:i + chunk_size] for i in range(0, len(entries), chunk_size)]
+    workers = workers or os.cpu_count() or 1
+    workers = max(1, min(workers, len(chunks)))
+
+    analyzed = []
+    # Spawned workers don't inherit the Streamlit server's threads and locks
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker) as executor:
+        for chunk_result in executor.map(_analyze_chunk, chunks):
+            analyzed.extend(chunk_result)
+            if progress:
+                progress(len(analyzed))
+    return analyzed
+
+
+class ImportJob:
+    """
+    Runs analyze_entries on a background thread and appends the results to
+    the journal store (anything with append_many, such as a UserJournal).
+    The UI polls done/total/finished between reruns.
+    """
+
+    def __init__(self, entries, store, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.entries = entries
+        self.store = store
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.total = len(entries)
+        self.done = 0
+        self.result = None
+        self.error = None
+        self.finished = False
+        self.merged = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _progress(self, done):
+        self.done = done
+
+    def _run(self):
+        try:
+            analyzed = analyze_entries(self.entries, self.workers, self.chunk_size, self._progress)
+            self.store.append_many(analyzed)
+            self.result = analyzed
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished = True
@@ -0,0 +1,209 @@
+"""
+Lightweight latency instrumentation.
+
+Wrap code in `with metrics.stage("name"):` or decorate functions with
+`@timed("name")` to record how long each stage takes. Samples are kept in
+bounded per-stage reservoirs from which p50/p95/p99 are computed on demand.
+When instrumentation is disabled, stage() hands back a shared no-op context
+manager and timed() adds a couple of attribute checks, so the hooks can stay
+in hot paths permanently.
+
+Set JOURNAL_METRICS=1 to enable recording for the whole process, or turn it
+on for a single thread, e.g. one Streamlit script run, with
+enable_thread(). Set JOURNAL_METRICS_PORT to serve
+the numbers on http://127.0.0.1:<port>/metrics (Prometheus text) and
+/metrics.json.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SAMPLES_PER_STAGE = 2048
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _Histogram:
+    __slots__ = ("samples", "count", "total")
+
+    def __init__(self):
+        self.samples = deque(maxlen=SAMPLES_PER_STAGE)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        summary = {"count": self.count, "mean_ms": self.total / self.count * 1000 if self.count else 0.0}
+        for q in QUANTILES:
+            value = ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+            summary[f"p{int(q * 100)}_ms"] = value * 1000
+        return summary
+
+
+class Instrumentation:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._server = None
+
+    def recording(self):
+        """
+        Whether stages run on the calling thread are recorded
+        """
+        return self.enabled or getattr(self._local, "enabled", False)
+
+    def enable_thread(self, enabled=True):
+        """
+        Record stages run on the calling thread even while instrumentation
+        is disabled process-wide
+        """
+        self._local.enabled = enabled
+
+    def stage(self, name):
+        if not self.recording():
+            return _NULL_TIMER
+        return _StageTimer(self, name)
+
+    def record(self, name, seconds):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = _Histogram()
+            histogram.add(seconds)
+        rerun = getattr(self._local, "rerun", None)
+        if rerun is not None:
+            rerun[name] = rerun.get(name, 0.0) + seconds
+
+    def begin_rerun(self, enabled=False):
+        """
+        Start collecting a per-stage breakdown for the current script run.
+        enabled records this run even while instrumentation is disabled
+        process-wide; either way the choice doesn't outlive the run's thread.
+        """
+        self.enable_thread(enabled)
+        self._local.rerun = None
+        if self.recording():
+            self._local.rerun = {}
+            self._local.rerun_start = time.perf_counter()
+
+    def end_rerun(self):
+        """
+        Finish the current script run; returns its {stage: seconds} breakdown
+        """
+        rerun = getattr(self._local, "rerun", None)
+        if rerun is None:
+            return None
+        self._local.rerun = None
+        elapsed = time.perf_counter() - self._local.rerun_start
+        self.record("rerun", elapsed)
+        rerun["rerun"] = elapsed
+        return rerun
+
+    def snapshot(self):
+        with self._lock:
+            return {name: histogram.summary() for name, histogram in sorted(self._histograms.items())}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def to_prometheus(self):
+        lines = [
+            "# HELP journal_stage_seconds Latency of instrumented journal stages",
+            "# TYPE journal_stage_seconds summary",
+        ]
+        for name, summary in self.snapshot().items():
+            for q in QUANTILES:
+                value = summary[f"p{int(q * 100)}_ms"] / 1000
+                lines.append(f'journal_stage_seconds{{stage="{name}",quantile="{q}"}} {value:.6f}')
+            total = summary["mean_ms"] * summary["count"] / 1000
+            lines.append(f'journal_stage_seconds_sum{{stage="{name}"}} {total:.6f}')
+            lines.append(f'journal_stage_seconds_count{{stage="{name}"}} {summary["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """
+        Expose /metrics (Prometheus text) and /metrics.json on a local port
+        """
+        if self._server is not None:
+            return self._server
+        instrumentation = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body = instrumentation.to_prometheus().encode()
+                    content_type = "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body = json.dumps(instrumentation.snapshot(), indent=2).encode()
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+
+metrics = Instrumentation(enabled=os.environ.get("JOURNAL_METRICS") == "1")
+
+
+def timed(name):
+    """
+    Decorator recording the duration of each call under name
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not metrics.recording():
+                return fn(*args, **kwargs)
+            with _StageTimer(metrics, name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
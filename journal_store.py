@@ -0,0 +1,388 @@
+import contextlib
+import json
+import os
+import threading
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+LEGACY_FILE = "journal_entries.json"
+JOURNAL_FILE = "journal_entries.jsonl"
+
+
+class ConflictError(Exception):
+    """
+    Raised when a write's expected version no longer matches the journal on
+    disk because another process has written to it in the meantime
+    """
+
+
+def new_entry_id():
+    """
+    Generate a stable identifier for a journal entry
+    """
+    return uuid.uuid4().hex
+
+
+class JournalStore:
+    """
+    Base class for journal storage backends.
+    A backend only needs to know how to load all entries, append one entry
+    and delete one entry by id; everything else is optional.
+    """
+
+    # Opaque token identifying the state of the journal this process last saw
+    version = None
+
+    def load(self):
+        raise NotImplementedError
+
+    def changes(self):
+        """
+        Records written by other processes since the last load/changes call,
+        or None if the journal must be reloaded from scratch
+        """
+        return []
+
+    def append(self, entry, expected_version=None):
+        raise NotImplementedError
+
+    def append_many(self, entries, expected_version=None):
+        return [self.append(entry, expected_version) for entry in entries]
+
+    def update(self, entry, expected_version=None):
+        raise NotImplementedError
+
+    def delete(self, entry_id, expected_version=None):
+        raise NotImplementedError
+
+    def compact(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class JsonlJournalStore(JournalStore):
+    """
+    Append-only JSON-Lines journal.
+
+    Every save appends a single "put" record and every delete appends a
+    "delete" tombstone, so a write costs O(1) regardless of journal size and a
+    crash can at worst lose the last partially written line: the next write
+    starts on a fresh line, leaving the torn one to be skipped. The log is
+    periodically compacted into a fresh file that is swapped in with an
+    atomic rename.
+
+    Several processes may share one log: writes hold an advisory lock on a
+    sidecar ".lock" file, and the store remembers the (inode, size) of the
+    log it last saw. A write given an expected_version fails with
+    ConflictError if someone else wrote since, and changes() returns what
+    they wrote so callers can catch up.
+    """
+
+    def __init__(self, path=JOURNAL_FILE, legacy_path=LEGACY_FILE,
+                 compact_interval=300, compact_ratio=0.5):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.compact_interval = compact_interval
+        self.compact_ratio = compact_ratio
+        self._lock = threading.RLock()
+        self._live = 0
+        self._dead = 0
+        self._stop = threading.Event()
+        self._compactor = None
+        self._lock_depth = 0
+        # Records written by other processes that were read ahead of our own writes
+        self._backlog = []
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock_file = open(path + ".lock", "a")
+        self.version = self.disk_version()
+
+        with self.locked():
+            self._migrate_legacy()
+
+        if compact_interval:
+            self._compactor = threading.Thread(target=self._compact_loop, daemon=True)
+            self._compactor.start()
+
+    @contextlib.contextmanager
+    def locked(self):
+        """
+        Hold the in-process lock and, for the outermost caller, the
+        cross-process file lock
+        """
+        with self._lock:
+            if self._lock_depth == 0 and fcntl is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0 and fcntl is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def disk_version(self):
+        """
+        Version of the log as it is on disk right now
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return (0, 0)
+        return (stat.st_ino, stat.st_size)
+
+    def _begin_write(self, expected_version):
+        """
+        Check expected_version and stash any records other processes wrote
+        since we last looked, so our own write doesn't hide them
+        """
+        if expected_version is not None and expected_version != self.disk_version():
+            raise ConflictError("the journal was modified by another process")
+        records = self._read_new_records()
+        if records is None:
+            # Rewritten elsewhere; callers will see a full reload from changes()
+            self._backlog = None
+        elif self._backlog is not None:
+            self._backlog.extend(records)
+
+    def _records_after(self, version):
+        """
+        Parse complete records appended after version. Returns (records,
+        new_version), with records None if the log was replaced or truncated.
+        """
+        inode, offset = version
+        disk_inode, size = self.disk_version()
+        if (disk_inode, size) == (inode, offset):
+            return [], version
+        if disk_inode != inode or size < offset:
+            return None, (disk_inode, size)
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read(size - offset)
+        # Leave a partially written final line for the next call
+        data = data[:data.rfind(b"\n") + 1]
+        records = []
+        for line in data.splitlines():
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return records, (inode, offset + len(data))
+
+    def _read_new_records(self):
+        """
+        Records appended after self.version, advancing it; None if the log
+        was replaced or truncated
+        """
+        records, self.version = self._records_after(self.version)
+        return records
+
+    def records_since(self, version):
+        """
+        Like changes(), but relative to a version the caller keeps (e.g. a
+        derived file) and without affecting this store's own tracking.
+        Returns (records or None, new_version).
+        """
+        with self.locked():
+            return self._records_after(version)
+
+    def changes(self):
+        with self.locked():
+            records = self._read_new_records()
+            backlog, self._backlog = self._backlog, []
+            if records is None or backlog is None:
+                return None
+            return backlog + records
+
+    def _migrate_legacy(self):
+        """
+        Import entries from the old single-array journal_entries.json
+        """
+        if os.path.exists(self.path) or not self.legacy_path:
+            return
+        if not os.path.exists(self.legacy_path):
+            return
+
+        with open(self.legacy_path, "r") as f:
+            entries = json.load(f)
+
+        for entry in entries:
+            entry.setdefault("id", new_entry_id())
+        self.rewrite(entries)
+
+        # Keep the original file around instead of deleting it
+        os.replace(self.legacy_path, self.legacy_path + ".migrated")
+
+    def _read_records(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from an interrupted write; skip it
+                    continue
+
+    def load(self):
+        """
+        Replay the log and return live entries in insertion order
+        """
+        with self.locked():
+            entries = {}
+            records = 0
+            for record in self._read_records():
+                records += 1
+                if record.get("op") == "put":
+                    entry = record["entry"]
+                    entries[entry["id"]] = entry
+                elif record.get("op") == "delete":
+                    entries.pop(record["id"], None)
+            self._live = len(entries)
+            self._dead = records - self._live
+            self.version = self.disk_version()
+            self._backlog = []
+            return list(entries.values())
+
+    def iter_entries(self):
+        """
+        Stream live entries in insertion order without holding the whole
+        journal in memory: a first pass finds which line holds the latest
+        version of each live entry, a second pass yields just those lines.
+        """
+        with self.locked():
+            latest = {}
+            for line_no, record in enumerate(self._read_records()):
+                if record.get("op") == "put":
+                    latest[record["entry"]["id"]] = line_no
+                elif record.get("op") == "delete":
+                    latest.pop(record["id"], None)
+            live_lines = set(latest.values())
+            del latest
+
+            for line_no, record in enumerate(self._read_records()):
+                if line_no in live_lines:
+                    yield record["entry"]
+
+    def _write_lines(self, lines):
+        with open(self.path, "a+b") as f:
+            # Terminate a line torn by a crash so it isn't glued to our first record
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+            f.write("".join(lines).encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        self.version = self.disk_version()
+
+    def _write_record(self, record):
+        self._write_lines([json.dumps(record) + "\n"])
+
+    def append(self, entry, expected_version=None):
+        """
+        Persist a single entry, assigning an id if it has none
+        """
+        entry.setdefault("id", new_entry_id())
+        with self.locked():
+            self._begin_write(expected_version)
+            self._write_record({"op": "put", "entry": entry})
+            self._live += 1
+        return entry["id"]
+
+    def append_many(self, entries, expected_version=None):
+        """
+        Persist several entries with a single write and fsync
+        """
+        entries = list(entries)
+        lines = []
+        for entry in entries:
+            entry.setdefault("id", new_entry_id())
+            lines.append(json.dumps({"op": "put", "entry": entry}) + "\n")
+        with self.locked():
+            self._begin_write(expected_version)
+            self._write_lines(lines)
+            self._live += len(lines)
+        return [entry["id"] for entry in entries]
+
+    def update(self, entry, expected_version=None):
+        """
+        Replace an existing entry; the new record supersedes the old one on replay
+        """
+        with self.locked():
+            self._begin_write(expected_version)
+            self._write_record({"op": "put", "entry": entry})
+            self._dead += 1
+
+    def delete(self, entry_id, expected_version=None):
+        """
+        Record a tombstone for the given entry id
+        """
+        with self.locked():
+            self._begin_write(expected_version)
+            self._write_record({"op": "delete", "id": entry_id})
+            self._live = max(self._live - 1, 0)
+            # Both the tombstone and the record it hides are now dead weight
+            self._dead += 2
+
+    def rewrite(self, entries):
+        """
+        Replace the journal with the given entries (any iterable), writing to
+        a temporary file that is atomically renamed over the log.
+        Returns the number of entries written.
+        """
+        with self.locked():
+            tmp_path = self.path + ".tmp"
+            live = 0
+            with open(tmp_path, "w") as f:
+                for entry in entries:
+                    f.write(json.dumps({"op": "put", "entry": entry}) + "\n")
+                    live += 1
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._live = live
+            self._dead = 0
+            self.version = self.disk_version()
+            return live
+
+    def compact(self):
+        """
+        Rewrite the log with only live entries, then atomically swap it in
+        """
+        with self.locked():
+            # Keep other processes' writes visible to changes() across the reload
+            self._begin_write(None)
+            pending = self._backlog
+            entries = self.load()
+            self._backlog = pending
+            if self._dead == 0:
+                return
+            self.rewrite(entries)
+
+    def needs_compaction(self):
+        total = self._live + self._dead
+        return total > 0 and self._dead / total >= self.compact_ratio
+
+    def _compact_loop(self):
+        while not self._stop.wait(self.compact_interval):
+            if self.needs_compaction():
+                try:
+                    self.compact()
+                except OSError as e:
+                    print(f"Warning: journal compaction failed: {e}")
+
+    def close(self):
+        self._stop.set()
+        self._lock_file.close()
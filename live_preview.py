@@ -0,0 +1,562 @@
+"""
+Live sentiment preview while an entry is being written.
+
+The text is split into sentences and each sentence is scored once: its raw
+VADER word valences (before normalization), punctuation counts and matched
+emotion keywords are cached by sentence text plus the few words preceding
+it, which VADER's negation and intensifier windows can reach.
+
+Each session keeps a RunningPreview of the text it last saw. An edit only
+re-splits and re-scores the sentences around it, and the pooled sums VADER
+normalizes (valence, positive, negative and neutral totals) are updated
+from the words of those sentences alone, following VADER's text-wide rules:
+a repeated word scores as at its first occurrence, and the first "but"
+damps everything before it and boosts everything after. So a keystroke
+costs the same in a long entry as in a short one, and the preview matches
+SentimentAnalyzer.analyze_text, except where positive and negative words
+balance exactly and VADER's summation order tips the result. Only typing
+the first "but", moving it, or flipping the text-wide ALL CAPS flag
+re-pools the whole text.
+"""
+import re
+import threading
+from collections import Counter, OrderedDict
+from nltk.sentiment.vader import SentiText
+from emotion_lexicon import tokenize
+from sentiment_analyzer import emotion_intensities, get_sentiment_analyzer, sentiment_label
+from instrumentation import timed
+
+# Sentences remembered across edits (shared by all sessions in the process)
+MAX_CACHED_SENTENCES = 8192
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n+")
+
+# VADER looks up to this many words back for negations and intensifiers
+CONTEXT_WORDS = 3
+
+# Multipliers VADER applies before and after the first "but"
+BEFORE_BUT = 0.5
+AFTER_BUT = 1.5
+
+# Decimal places the running sums are rounded to before use
+SUM_DIGITS = 9
+
+
+def split_sentences(text):
+    return [sentence for sentence, _, _ in sentence_spans(text)]
+
+
+def sentence_spans(text, start=0, end=None):
+    """
+    (sentence, start, end) for each sentence of text[start:end]; start and
+    end must not fall inside a sentence
+    """
+    end = len(text) if end is None else end
+    spans = []
+    position = start
+    for match in SENTENCE_BOUNDARY.finditer(text, start, end):
+        _add_span(spans, text, position, match.start())
+        position = match.end()
+    _add_span(spans, text, position, end)
+    return spans
+
+
+def _add_span(spans, text, start, end):
+    segment = text[start:end]
+    sentence = segment.strip()
+    if sentence:
+        start += len(segment) - len(segment.lstrip())
+        spans.append((sentence, start, start + len(sentence)))
+
+
+def _common_prefix(a, b):
+    # Binary search comparing only the undecided part, so O(len) overall
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if b.startswith(a[low:middle], low):
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _common_suffix(a, b, limit):
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if b.endswith(a[len(a) - middle:len(a) - low], 0, len(b) - low):
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _vader_words(text):
+    # Whitespace tokens VADER keeps (it drops single characters)
+    return [token for token in text.split() if len(token) > 1]
+
+
+def _vader_supported(sia):
+    # The running preview follows these parts of VADER step by step
+    constants = getattr(sia, "constants", None)
+    return (hasattr(sia, "sentiment_valence") and hasattr(sia, "score_valence")
+            and hasattr(sia, "lexicon")
+            and all(hasattr(constants, name) for name in
+                    ("PUNC_LIST", "REGEX_REMOVE_PUNCTUATION", "BOOSTER_DICT", "normalize")))
+
+
+def _valences(sia, text, context=(), cap_diff=None):
+    """
+    (words, valences) of text as SentimentIntensityAnalyzer.polarity_scores
+    computes them inside a longer text, before the "but" rule and
+    normalization. context holds the words preceding text and cap_diff the
+    whole text's ALL CAPS flag.
+    """
+    sentitext = SentiText(" ".join(context + (text,)), sia.constants.PUNC_LIST,
+                          sia.constants.REGEX_REMOVE_PUNCTUATION)
+    if cap_diff is not None:
+        sentitext.is_cap_diff = cap_diff
+    words = sentitext.words_and_emoticons
+    first_index = {}
+    for i in range(len(context), len(words)):
+        first_index.setdefault(words[i], i)
+    valences = []
+    for word in words[len(context):]:
+        i = first_index[word]
+        if (i < len(words) - 1 and word.lower() == "kind" and words[i + 1].lower() == "of") \
+                or word.lower() in sia.constants.BOOSTER_DICT:
+            valences.append(0)
+            continue
+        valences = sia.sentiment_valence(0, sentitext, word, i, valences)
+    return words[len(context):], valences
+
+
+def _but_index(words):
+    for i, word in enumerate(words):
+        if word.lower() == "but":
+            return i
+    return None
+
+
+def _but_multiplier(i, but_index):
+    if but_index is None or i == but_index:
+        return 1.0
+    return BEFORE_BUT if i < but_index else AFTER_BUT
+
+
+class _SentenceScore:
+    __slots__ = ("first_valences", "counts", "neutral", "but_index", "but_counts",
+                 "exclamations", "questions", "compound", "keywords")
+
+    def __init__(self, sia, sentence, context, cap_diff, keywords):
+        words, valences = _valences(sia, sentence, context, cap_diff)
+        # Only lexicon words can score; every other word is a neutral 0.
+        # VADER scores every occurrence of a word in its first occurrence's context.
+        self.first_valences = {}
+        self.counts = {}
+        for word, valence in zip(words, valences):
+            if word.lower() in sia.lexicon:
+                self.first_valences.setdefault(word, valence)
+                self.counts[word] = self.counts.get(word, 0) + 1
+        self.neutral = len(words) - sum(self.counts.values())
+        # Weighted counts for when this sentence holds the text's first "but"
+        self.but_index = _but_index(words)
+        self.but_counts = None
+        if self.but_index is not None:
+            self.but_counts = dict.fromkeys(self.counts, 0.0)
+            for i, word in enumerate(words):
+                if word in self.but_counts:
+                    self.but_counts[word] += _but_multiplier(i, self.but_index)
+        self.exclamations = sentence.count("!")
+        self.questions = sentence.count("?")
+        own = [valence * _but_multiplier(i, self.but_index) for i, valence in enumerate(valences)]
+        self.compound = sia.score_valence(own, sentence)["compound"]
+        self.keywords = keywords
+
+
+class _Slot:
+    """
+    One sentence of a RunningPreview's text
+    """
+    __slots__ = ("sentence", "start", "end", "index", "tokens", "caps", "context", "tail",
+                 "uses_caps", "score")
+
+    def __init__(self, sentence, start, end):
+        self.sentence = sentence
+        self.start = start
+        self.end = end
+        self.index = 0
+        tokens = _vader_words(sentence)
+        self.tokens = tuple(tokens)
+        self.caps = sum(1 for token in tokens if token.isupper())
+        self.context = ()
+        self.tail = ()
+        self.uses_caps = False
+        self.score = None
+
+    def set_context(self, context):
+        self.context = context
+        self.tail = (context + self.tokens)[-CONTEXT_WORDS:]
+        # The ALL CAPS flag only changes the score of ALL CAPS words
+        self.uses_caps = bool(self.caps) or any(token.isupper() for token in context)
+
+
+class SentencePreview:
+    def __init__(self, analyzer=None, max_sentences=MAX_CACHED_SENTENCES):
+        self.analyzer = analyzer or get_sentiment_analyzer()
+        self.max_sentences = max_sentences
+        self.hits = 0
+        self.misses = 0
+        self._sentences = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _score(self, sentence, context, cap_diff):
+        key = (sentence, context, cap_diff)
+        with self._lock:
+            score = self._sentences.get(key)
+            if score is not None:
+                self._sentences.move_to_end(key)
+                self.hits += 1
+                return score
+
+        score = _SentenceScore(self.analyzer.sia, sentence, context, cap_diff,
+                               self.analyzer.emotion_matcher.match_tokens(tokenize(sentence)))
+        with self._lock:
+            self.misses += 1
+            self._sentences[key] = score
+            while len(self._sentences) > self.max_sentences:
+                self._sentences.popitem(last=False)
+        return score
+
+    def running(self):
+        """
+        A RunningPreview for one session's text box
+        """
+        return RunningPreview(self)
+
+    def analyze(self, text):
+        """
+        Preview result for text, in the same format as analyze_text plus a
+        per-sentence "sentences" list of (sentence, compound score)
+        """
+        return self.running().analyze(text)
+
+
+class RunningPreview:
+    """
+    Preview of one text as it is edited, updated from the sentences each
+    edit touches
+    """
+
+    def __init__(self, preview):
+        self.preview = preview
+        self.text = ""
+        self._lock = threading.Lock()
+        self._supported = _vader_supported(preview.analyzer.sia)
+        self._reset()
+
+    def _reset(self):
+        self._slots = []
+        self._tokens = 0
+        self._caps = 0
+        self._cap_diff = False
+        self._but_slots = set()
+        self._but_slot = None
+        self._exclamations = 0
+        self._questions = 0
+        self._neutral = 0
+        self._keywords = Counter()
+        # Per lexicon word: slots containing it, first of them, count,
+        # "but"-weighted count and its share of the pooled sums
+        self._occurrences = {}
+        self._first = {}
+        self._count = {}
+        self._weight = {}
+        self._shares = {}
+        self._sums = [0.0, 0.0, 0.0, 0]
+
+    @timed("live_preview")
+    def analyze(self, text):
+        """
+        Preview result for text, in the same format as analyze_text plus a
+        per-sentence "sentences" list of (sentence, compound score)
+        """
+        if not self._supported:
+            # VADER's internals differ from what the running sums follow
+            return self._full_analysis(text)
+        with self._lock:
+            if text != self.text:
+                self._update(text)
+            return self._result()
+
+    def _full_analysis(self, text):
+        analyzer = self.preview.analyzer
+        result = dict(analyzer.analyze_text(text))
+        result["sentences"] = [(sentence, analyzer.sia.polarity_scores(sentence)["compound"])
+                               for sentence in split_sentences(text)]
+        return result
+
+    def _update(self, text):
+        old, slots = self.text, self._slots
+        if not slots:
+            first, last, start, old_end = 0, -1, 0, len(old)
+        else:
+            prefix = _common_prefix(old, text)
+            suffix = _common_suffix(old, text, min(len(old), len(text)) - prefix)
+            edit_end = len(old) - suffix
+            # Re-split from the sentence before the edit (the edit may have
+            # removed the boundary after it) to the first sentence wholly
+            # after it (the edit may have removed the boundary before it)
+            first = max(self._find(lambda slot: slot.end >= prefix) - 1, 0)
+            last = min(self._find(lambda slot: slot.start > edit_end), len(slots) - 1)
+            start = 0 if first == 0 else slots[first].start
+            old_end = len(old) if last == len(slots) - 1 else slots[last].end
+        delta = len(text) - len(old)
+        new_slots = [_Slot(*span) for span in sentence_spans(text, start, old_end + delta)]
+        removed = slots[first:last + 1]
+
+        for slot in removed:
+            self._tokens -= len(slot.tokens)
+            self._caps -= slot.caps
+        for slot in new_slots:
+            self._tokens += len(slot.tokens)
+            self._caps += slot.caps
+        cap_diff = 0 < self._tokens - self._caps < self._tokens
+        self.text = text
+
+        for slot in slots[last + 1:]:
+            slot.start += delta
+            slot.end += delta
+
+        # Later sentences whose preceding words changed are re-scored too
+        context = slots[first - 1].tail if first > 0 else ()
+        for slot in new_slots:
+            slot.set_context(context)
+            context = slot.tail
+        end = last + 1
+        while end < len(slots) and slots[end].context != context:
+            old_slot = slots[end]
+            slot = _Slot(old_slot.sentence, old_slot.start, old_slot.end)
+            slot.set_context(context)
+            context = slot.tail
+            new_slots.append(slot)
+            removed.append(old_slot)
+            end += 1
+
+        if cap_diff != self._cap_diff:
+            self._cap_diff = cap_diff
+            slots[first:end] = new_slots
+            for i, slot in enumerate(slots):
+                slot.index = i
+                if slot.score is None or slot.uses_caps:
+                    slot.score = self._score(slot)
+            self._repool()
+            return
+
+        for slot in new_slots:
+            slot.score = self._score(slot)
+        self._replace(first, end, removed, new_slots)
+
+    def _find(self, predicate):
+        # First slot index for which predicate holds; it must be monotonic
+        low, high = 0, len(self._slots)
+        while low < high:
+            middle = (low + high) // 2
+            if predicate(self._slots[middle]):
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def _score(self, slot):
+        cap_diff = self._cap_diff if slot.uses_caps else None
+        return self.preview._score(slot.sentence, slot.context, cap_diff)
+
+    def _multiplier(self, slot):
+        if self._but_slot is None:
+            return 1.0
+        return BEFORE_BUT if slot.index < self._but_slot.index else AFTER_BUT
+
+    def _word_weight(self, slot, word):
+        if slot is self._but_slot:
+            return slot.score.but_counts[word]
+        return slot.score.counts[word] * self._multiplier(slot)
+
+    def _replace(self, first, end, removed, added):
+        """
+        Swap slots[first:end] (removed) for added and update the pooled sums
+        from just those slots
+        """
+        slots = self._slots
+        old_but_slot = self._but_slot
+        changed = set()
+        for slot in removed:
+            self._remove_slot(slot, changed)
+        slots[first:end] = added
+        if len(added) != end - first:
+            for i in range(first, len(slots)):
+                slots[i].index = i
+        else:
+            for i, slot in enumerate(added, start=first):
+                slot.index = i
+        for slot in added:
+            if slot.score.but_index is not None:
+                self._but_slots.add(slot)
+        self._but_slot = min(self._but_slots, key=lambda slot: slot.index, default=None)
+
+        # Slots outside the edit keep their multiplier unless the first
+        # "but" moved past one of them
+        if self._but_slot is not old_but_slot and not (
+                old_but_slot in removed and self._but_slot in added):
+            self._repool()
+            return
+        for slot in added:
+            self._add_slot(slot, changed)
+        for word in changed:
+            self._update_share(word)
+
+    def _remove_slot(self, slot, changed):
+        score = slot.score
+        self._neutral -= score.neutral
+        self._exclamations -= score.exclamations
+        self._questions -= score.questions
+        self._keywords.subtract(score.keywords)
+        self._but_slots.discard(slot)
+        for word, count in score.counts.items():
+            occurrences = self._occurrences[word]
+            del occurrences[slot]
+            self._count[word] -= count
+            self._weight[word] -= self._word_weight(slot, word)
+            if self._first[word] is slot:
+                self._first[word] = None
+            changed.add(word)
+
+    def _add_slot(self, slot, changed):
+        score = slot.score
+        self._neutral += score.neutral
+        self._exclamations += score.exclamations
+        self._questions += score.questions
+        self._keywords.update(score.keywords)
+        for word, count in score.counts.items():
+            occurrences = self._occurrences.setdefault(word, {})
+            occurrences[slot] = None
+            self._count[word] = self._count.get(word, 0) + count
+            self._weight[word] = self._weight.get(word, 0.0) + self._word_weight(slot, word)
+            first = self._first.get(word)
+            if first is None or slot.index < first.index:
+                self._first[word] = slot
+            changed.add(word)
+
+    def _update_share(self, word):
+        """
+        Replace word's share of the pooled valence, positive, negative and
+        neutral sums, as VADER's _sift_sentiment_scores would count it
+        """
+        old = self._shares.pop(word, None)
+        if old is not None:
+            for i, value in enumerate(old):
+                self._sums[i] -= value
+        occurrences = self._occurrences.get(word)
+        if not occurrences:
+            for name in (self._occurrences, self._first, self._count, self._weight):
+                name.pop(word, None)
+            return
+        if self._first[word] is None:
+            # Its first occurrence was deleted
+            self._first[word] = min(occurrences, key=lambda slot: slot.index)
+        valence = self._first[word].score.first_valences[word]
+        count, weight = self._count[word], self._weight[word]
+        weighted = valence * weight
+        if valence > 0:
+            share = (weighted, weighted + count, 0.0, 0)
+        elif valence < 0:
+            share = (weighted, 0.0, weighted - count, 0)
+        else:
+            share = (0.0, 0.0, 0.0, count)
+        self._shares[word] = share
+        for i, value in enumerate(share):
+            self._sums[i] += value
+
+    def _repool(self):
+        """
+        Recompute the pooled sums over every slot
+        """
+        slots, tokens, caps, cap_diff = self._slots, self._tokens, self._caps, self._cap_diff
+        self._reset()
+        self._slots, self._tokens, self._caps, self._cap_diff = slots, tokens, caps, cap_diff
+        for i, slot in enumerate(slots):
+            slot.index = i
+            if slot.score.but_index is not None:
+                self._but_slots.add(slot)
+        self._but_slot = min(self._but_slots, key=lambda slot: slot.index, default=None)
+        changed = set()
+        for slot in slots:
+            self._add_slot(slot, changed)
+        for word in changed:
+            self._update_share(word)
+
+    def _vader_scores(self):
+        """
+        VADER neg/neu/pos/compound from the pooled sums, following
+        SentimentIntensityAnalyzer.score_valence
+        """
+        # Adding and removing shares leaves float residue; round it away so
+        # an exact balance still reads as zero or a tie, as on a fresh sum
+        valence, pos_sum, neg_sum = (round(value, SUM_DIGITS) or 0.0 for value in self._sums[:3])
+        neu_count = self._sums[3] + self._neutral
+        if not self._slots or not (neu_count or self._shares):
+            return {"neg": 0.0, "neu": 0.0, "pos": 0.0, "compound": 0.0}
+
+        # Punctuation emphasis counts over the whole text, capped as in VADER
+        emphasis = min(self._exclamations, 4) * 0.292
+        if self._questions > 3:
+            emphasis += 0.96
+        elif self._questions > 1:
+            emphasis += self._questions * 0.18
+
+        if valence > 0:
+            valence += emphasis
+        elif valence < 0:
+            valence -= emphasis
+        if pos_sum > abs(neg_sum):
+            pos_sum += emphasis
+        elif pos_sum < abs(neg_sum):
+            neg_sum -= emphasis
+
+        total = pos_sum + abs(neg_sum) + neu_count
+        return {
+            "neg": round(abs(neg_sum / total), 3),
+            "neu": round(abs(neu_count / total), 3),
+            "pos": round(abs(pos_sum / total), 3),
+            "compound": round(self.preview.analyzer.sia.constants.normalize(valence), 4),
+        }
+
+    def _result(self):
+        vader_scores = self._vader_scores()
+        matcher = self.preview.analyzer.emotion_matcher
+        keywords = {keyword for keyword, count in self._keywords.items() if count > 0}
+        counts = dict(zip(matcher.emotions, matcher.count_matches(keywords)))
+        return {
+            "label": sentiment_label(vader_scores["compound"]),
+            "score": vader_scores["compound"],
+            "emotions": emotion_intensities(counts, vader_scores),
+            "raw_vader": vader_scores,
+            "sentences": [(slot.sentence, slot.score.compound) for slot in self._slots],
+        }
+
+
+_preview = None
+_preview_lock = threading.Lock()
+
+
+def get_sentence_preview():
+    """
+    Return the process-wide SentencePreview, creating it on first use
+    """
+    global _preview
+    if _preview is None:
+        with _preview_lock:
+            if _preview is None:
+                _preview = SentencePreview()
+    return _preview
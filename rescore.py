@@ -0,0 +1,74 @@
+"""
+Re-analyze an existing journal after a lexicon or emotion-rule change.
+
+Entries are streamed from the journal in chunks, scored with
+SentimentAnalyzer.analyze_batch and written to a new journal file that
+replaces the old one atomically once every entry has been processed.
+Stop the app while this runs.
+
+Usage:
+    python rescore.py [--journal journal_entries.jsonl] [--chunk-size 500]
+"""
+import argparse
+import itertools
+import time
+from journal_store import JsonlJournalStore, JOURNAL_FILE
+from sentiment_analyzer import get_sentiment_analyzer
+from analysis_queue import PENDING_LABEL
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def rescore_entries(entries, analyzer, chunk_size=500, progress=None):
+    """
+    Yield entries with updated sentiment, sentiment_score and emotions.
+    Entries still waiting for analysis are passed through untouched; the
+    app's analysis queue completes them, response and strategy included.
+    """
+    done = 0
+    for chunk in chunked(entries, chunk_size):
+        analyzed = [entry for entry in chunk if entry.get("sentiment") != PENDING_LABEL]
+        results = analyzer.analyze_batch(entry["text"] for entry in analyzed)
+        for entry, result in zip(analyzed, results):
+            entry["sentiment"] = result["label"]
+            entry["sentiment_score"] = result["score"]
+            entry["emotions"] = result["emotions"]
+        yield from chunk
+        done += len(chunk)
+        if progress:
+            progress(done)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-analyze every entry in a journal file.")
+    parser.add_argument("--journal", default=JOURNAL_FILE, help="journal file to rescore")
+    parser.add_argument("--chunk-size", type=int, default=500, help="entries analyzed per batch")
+    args = parser.parse_args()
+
+    store = JsonlJournalStore(args.journal, legacy_path=None, compact_interval=0)
+    analyzer = get_sentiment_analyzer()
+    # Load VADER before starting the clock
+    analyzer.analyze_text("")
+
+    start = time.perf_counter()
+
+    def report(done):
+        elapsed = time.perf_counter() - start
+        print(f"\r{done} entries rescored ({done / elapsed:.0f} entries/s)", end="", flush=True)
+
+    total = store.rewrite(rescore_entries(store.iter_entries(), analyzer, args.chunk_size, report))
+
+    elapsed = time.perf_counter() - start
+    rate = total / elapsed if elapsed > 0 else 0.0
+    print(f"\nRescored {total} entries in {elapsed:.2f}s ({rate:.0f} entries/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,99 +1,163 @@
-import random
+import json
+import os
+import threading
+import time
+import zlib
+from instrumentation import timed
+
+TEMPLATES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "response_templates.json")
+
+# How often, at most, the templates file is checked for changes
+RELOAD_CHECK_INTERVAL = 2.0
+
+class _Tables:
+    """
+    Lookup tables compiled from a templates file. Every (label, emotion,
+    bucket) combination is resolved to its phrase list up front, falling
+    back to the label's default responses, so selection is a dict lookup.
+    """
+
+    __slots__ = ("buckets", "responses", "strategies", "defaults")
+
+    def __init__(self, templates):
+        # (lower bound, name), highest bound first
+        self.buckets = sorted(((bound, name) for name, bound in templates["buckets"].items()), reverse=True)
+        bucket_names = [name for _, name in self.buckets]
+
+        self.defaults = {}
+        self.responses = {}
+        for label, options in templates["responses"].items():
+            default = tuple(options["default"])
+            self.defaults[label] = default
+            for emotion, phrases in options.items():
+                if emotion == "default":
+                    continue
+                for bucket in bucket_names:
+                    selected = phrases.get(bucket) if isinstance(phrases, dict) else phrases
+                    self.responses[(label, emotion, bucket)] = tuple(selected) if selected else default
+
+        self.strategies = {}
+        for emotion, phrases in templates["strategies"].items():
+            for bucket in bucket_names:
+                selected = phrases.get(bucket) if isinstance(phrases, dict) else phrases
+                if selected:
+                    self.strategies[(emotion, bucket)] = tuple(selected)
+
+    def bucket(self, intensity):
+        for bound, name in self.buckets:
+            if intensity >= bound:
+                return name
+        return self.buckets[-1][1]
+
+
+def _dominant(emotions):
+    if not emotions:
+        return None, 0.0
+    return max(emotions.items(), key=lambda x: x[1])
+
+
+def _pick(options, text, salt, seed):
+    """
+    Deterministically choose one of options for text: the same entry always
+    gets the same phrase, different entries spread across the list
+    """
+    digest = zlib.crc32(f"{seed}\x00{salt}\x00{text}".encode("utf-8"))
+    return options[digest % len(options)]
+
 
 class ResponseGenerator:
-    def __init__(self):
-        # We'll use pre-defined responses only
-        self.has_model = False
-        print("Using pre-defined responses.")
-        
-        # Pre-defined responses
-        self.positive_responses = [
-            "It's wonderful to hear you're feeling good! Keep nurturing those positive emotions and remember what contributed to them.",
-            "I'm so glad you're experiencing these positive feelings. You deserve these moments of joy!",
-            "That's fantastic news! Acknowledging these positive emotions helps reinforce them.",
-            "Your positive outlook is inspiring. Consider how you might carry this energy forward into tomorrow.",
-            "Wonderful! Take a moment to really savor these positive feelings and what brought them about."
-        ]
-        
-        self.negative_responses = [
-            "I hear that you're going through a difficult time. Remember that it's okay to feel this way, and these feelings won't last forever.",
-            "I'm sorry you're feeling down. Be gentle with yourself today and remember that even small acts of self-care can help.",
-            "It sounds like today has been challenging. Try to focus on small things within your control and remember that you have overcome difficult times before.",
-            "When we face tough emotions, sometimes just acknowledging them can help. You're showing strength by expressing your feelings.",
-            "During difficult moments, try to treat yourself with the same kindness you would offer a good friend. You deserve compassion."
-        ]
-        
-        self.neutral_responses = [
-            "Thank you for sharing your thoughts today. Regular reflection like this is a powerful practice for self-awareness.",
-            "Even in neutral moments, you're developing important insight through your journaling practice.",
-            "Every day doesn't need to be extraordinary. There's value in these moments of calm reflection too.",
-            "Your commitment to checking in with yourself shows dedication to your well-being.",
-            "Sometimes a neutral day provides good space for reflection on your broader goals and values."
-        ]
-    
+    def __init__(self, templates_path=TEMPLATES_FILE, seed=0):
+        # Responses and strategies come from a JSON templates file, reloaded when it changes
+        self.templates_path = templates_path
+        self.seed = seed
+        self._mtime = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self._tables = None
+        self._maybe_reload(force=True)
+
+    def _maybe_reload(self, force=False):
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return
+        with self._lock:
+            self._next_check = now + RELOAD_CHECK_INTERVAL
+            try:
+                mtime = os.stat(self.templates_path).st_mtime_ns
+            except OSError:
+                if self._tables is None:
+                    raise
+                return
+            if mtime == self._mtime:
+                return
+            try:
+                with open(self.templates_path, "r", encoding="utf-8") as f:
+                    tables = _Tables(json.load(f))
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                if self._tables is None:
+                    raise
+                # Keep serving the previous templates until the file is fixed
+                print(f"Warning: could not reload {self.templates_path}: {e}")
+                return
+            self._tables = tables
+            self._mtime = mtime
+
+    def _response(self, tables, text, sentiment_info):
+        label = sentiment_info["label"]
+        emotion, intensity = _dominant(sentiment_info.get("emotions", {}))
+        options = tables.responses.get((label, emotion, tables.bucket(intensity)))
+        if options is None:
+            options = tables.defaults.get(label) or tables.defaults["Neutral"]
+        return _pick(options, text, "response", self.seed)
+
+    def _strategy(self, tables, text, emotions):
+        emotion, intensity = _dominant(emotions)
+        options = tables.strategies.get((emotion, tables.bucket(intensity)))
+        if options is None:
+            return None
+        return _pick(options, text, "strategy", self.seed)
+
+    @timed("generate_response")
     def generate_response(self, text, sentiment_info):
         """
-        Generate an empathetic response based on the sentiment of the input text
-        Uses pre-defined responses
+        Generate an empathetic response based on the sentiment of the input
+        text and its strongest emotion
         """
-        sentiment = sentiment_info["label"]
-        emotions = sentiment_info.get("emotions", {})
-        
-        # Select appropriate response set based on sentiment
-        if sentiment == "Positive":
-            responses = self.positive_responses
-        elif sentiment == "Negative":
-            responses = self.negative_responses
-        else:
-            responses = self.neutral_responses
-        
-        # Determine if any emotion is particularly strong
-        strongest_emotion = None
-        strongest_score = 0.5  # Threshold
-        
-        for emotion, score in emotions.items():
-            if score > strongest_score:
-                strongest_emotion = emotion
-                strongest_score = score
-        
-        # Select a random response from the appropriate set
-        return random.choice(responses)
-            
-    def get_coping_strategy(self, emotions):
+        self._maybe_reload()
+        return self._response(self._tables, text, sentiment_info)
+
+    @timed("get_coping_strategy")
+    def get_coping_strategy(self, emotions, *, text=""):
         """
-        Suggest a specific coping strategy based on detected emotions
+        Suggest a specific coping strategy based on detected emotions; the
+        entry text picks among the candidates, so an entry keeps its strategy
         """
-        strategies = {
-            "sadness": [
-                "Consider talking to someone you trust about how you're feeling",
-                "Gentle exercise like walking can help lift your mood",
-                "Be kind to yourself today and engage in a small self-care activity"
-            ],
-            "anger": [
-                "Deep breathing exercises can help manage feelings of anger",
-                "Physical activity can be a healthy outlet for frustration",
-                "Writing out your thoughts might help process these emotions"
-            ],
-            "fear": [
-                "Grounding exercises can help with anxiety - try naming 5 things you can see, 4 things you can touch, etc.",
-                "Limiting news and social media might help reduce feelings of anxiety",
-                "Progressive muscle relaxation can help release tension from anxiety"
-            ],
-            "joy": [
-                "Savor this positive feeling by writing down what contributed to it",
-                "Share your positive experience with someone close to you",
-                "Consider how you might create similar positive experiences in the future"
-            ]
-        }
-        
-        # Find the strongest emotion
-        if not emotions:
-            return None
-            
-        strongest_emotion = max(emotions.items(), key=lambda x: x[1])
-        
-        # Only suggest a strategy if the emotion is significant
-        if strongest_emotion[1] > 0.3 and strongest_emotion[0] in strategies:
-            return random.choice(strategies[strongest_emotion[0]])
-            
-        return None 
\ No newline at end of file
+        self._maybe_reload()
+        return self._strategy(self._tables, text, emotions)
+
+    def generate_batch(self, texts, sentiment_results):
+        """
+        Return a (response, strategy) pair for each text, using one
+        snapshot of the templates for the whole batch
+        """
+        self._maybe_reload()
+        tables = self._tables
+        return [(self._response(tables, text, info), self._strategy(tables, text, info.get("emotions", {})))
+                for text, info in zip(texts, sentiment_results)]
+
+
+_generator = None
+_generator_lock = threading.Lock()
+
+
+def get_response_generator():
+    """
+    Return the process-wide ResponseGenerator, creating it on first use.
+    Set RESPONSE_TEMPLATES to use a different templates file.
+    """
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                _generator = ResponseGenerator(os.environ.get("RESPONSE_TEMPLATES", TEMPLATES_FILE))
+    return _generator
@@ -0,0 +1,240 @@
+"""
+Persistent inverted index for full-text search over journal entries.
+
+Postings (token -> entry id, term frequency, token positions) live in a
+SQLite file next to the journal, so a query only reads the posting lists
+for its own terms instead of scanning entry bodies. Results are ranked with
+BM25; quoted phrases must match consecutive positions.
+"""
+import math
+import os
+import re
+import sqlite3
+import threading
+
+INDEX_FILE = "journal_index.sqlite3"
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Largest candidate set looked up with an IN (...) clause instead of a full posting list
+MAX_IN_CLAUSE = 900
+
+# Records indexed per transaction; searches can run between chunks
+INDEX_CHUNK = 500
+
+QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+# Unlike the emotion matcher's tokens, search tokens keep digits ("2024", "5k")
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z0-9]+)*")
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def parse_query(query):
+    """
+    Split a query into (terms, phrases); phrases are token lists
+    """
+    terms, phrases = [], []
+    for phrase, word in QUERY_PATTERN.findall(query):
+        if phrase:
+            tokens = tokenize(phrase)
+            if len(tokens) > 1:
+                phrases.append(tokens)
+            else:
+                terms.extend(tokens)
+        else:
+            terms.extend(tokenize(word))
+    return terms, phrases
+
+
+class SearchIndex:
+    def __init__(self, path=INDEX_FILE, read_only=False):
+        """
+        read_only opens an existing index without ever writing to it; with
+        no index file yet, searches find nothing
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = None
+        if read_only:
+            if os.path.exists(path):
+                self._db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+            return
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            "  entry_id TEXT PRIMARY KEY, length INTEGER NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "  token TEXT NOT NULL, entry_id TEXT NOT NULL,"
+            "  tf INTEGER NOT NULL, length INTEGER NOT NULL, positions TEXT NOT NULL,"
+            "  PRIMARY KEY (token, entry_id)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS postings_by_entry ON postings (entry_id);"
+            # Corpus statistics for BM25, updated in the same transaction as
+            # docs so every process sharing the file sees the same numbers
+            "CREATE TABLE IF NOT EXISTS stats ("
+            "  id INTEGER PRIMARY KEY CHECK (id = 0),"
+            "  doc_count INTEGER NOT NULL, total_length INTEGER NOT NULL);"
+            "INSERT OR IGNORE INTO stats (id, doc_count, total_length)"
+            "  SELECT 0, COUNT(*), COALESCE(SUM(length), 0) FROM docs;"
+        )
+        self._db.commit()
+
+    def _insert(self, entry_id, text):
+        tokens = tokenize(text)
+        positions = {}
+        for position, token in enumerate(tokens):
+            positions.setdefault(token, []).append(position)
+        self._delete(entry_id)
+        self._db.execute("INSERT INTO docs (entry_id, length) VALUES (?, ?)",
+                         (entry_id, len(tokens)))
+        # Document length is repeated in each posting so ranking needs no extra lookup
+        self._db.executemany(
+            "INSERT INTO postings (token, entry_id, tf, length, positions) VALUES (?, ?, ?, ?, ?)",
+            [(token, entry_id, len(p), len(tokens), ",".join(map(str, p)))
+             for token, p in positions.items()],
+        )
+        self._db.execute("UPDATE stats SET doc_count = doc_count + 1, total_length = total_length + ?",
+                         (len(tokens),))
+
+    def _delete(self, entry_id):
+        row = self._db.execute("SELECT length FROM docs WHERE entry_id = ?", (entry_id,)).fetchone()
+        if row is None:
+            return
+        self._db.execute("DELETE FROM postings WHERE entry_id = ?", (entry_id,))
+        self._db.execute("DELETE FROM docs WHERE entry_id = ?", (entry_id,))
+        self._db.execute("UPDATE stats SET doc_count = doc_count - 1, total_length = total_length - ?",
+                         (row[0],))
+
+    def _begin(self):
+        # Take the write lock up front so the read-then-write in _insert is
+        # atomic even when another process shares the index
+        self._db.execute("BEGIN IMMEDIATE")
+
+    def ids(self):
+        """
+        Set of indexed entry ids
+        """
+        with self._lock:
+            if self._db is None:
+                return set()
+            return {entry_id for (entry_id,) in self._db.execute("SELECT entry_id FROM docs")}
+
+    def apply(self, records):
+        """
+        Apply journal "put" and "delete" records in order, committing every
+        INDEX_CHUNK records so a large import doesn't hold up searches
+        """
+        records = list(records)
+        for start in range(0, len(records), INDEX_CHUNK):
+            with self._lock:
+                self._begin()
+                for record in records[start:start + INDEX_CHUNK]:
+                    if record.get("op") == "put":
+                        self._insert(record["entry"]["id"], record["entry"]["text"])
+                    elif record.get("op") == "delete":
+                        self._delete(record["id"])
+                self._db.commit()
+
+    def search(self, query, candidates=None):
+        """
+        Return [(entry_id, score)] for entries containing every term and
+        phrase in query, best match first. candidates, if given, is a
+        predicate on entry ids used to apply date/sentiment filters.
+        """
+        terms, phrases = parse_query(query)
+        required = list(dict.fromkeys(terms + [t for phrase in phrases for t in phrase]))
+        if not required or self._db is None:
+            return []
+
+        with self._lock:
+            # One read transaction, so the statistics and postings agree
+            # even while another process writes to the index
+            self._db.execute("BEGIN")
+            try:
+                found = self._read_postings(required, phrases, candidates)
+            finally:
+                self._db.commit()
+        if found is None:
+            return []
+        doc_count, avg_length, doc_freq, postings, matches = found
+
+        results = []
+        for entry_id in matches:
+            if any(not self._has_phrase(postings, phrase, entry_id) for phrase in phrases):
+                continue
+            score = 0.0
+            for token in required:
+                df = doc_freq[token]
+                tf, length, _ = postings[token][entry_id]
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                score += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avg_length))
+            results.append((entry_id, score))
+
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results
+
+    def _read_postings(self, required, phrases, candidates):
+        """
+        Corpus statistics, document frequencies and postings of the entries
+        matching every required token, or None if there are none
+        """
+        doc_count, total_length = self._db.execute("SELECT doc_count, total_length FROM stats").fetchone()
+        if not doc_count:
+            return None
+        avg_length = total_length / doc_count
+
+        # Document frequency per term; start from the rarest so the
+        # candidate set is small before the common terms are read
+        doc_freq = {}
+        for token in required:
+            doc_freq[token] = self._db.execute(
+                "SELECT COUNT(*) FROM postings WHERE token = ?", (token,)
+            ).fetchone()[0]
+            if not doc_freq[token]:
+                return None
+
+        # Positions are only needed to verify phrases
+        phrase_tokens = {token for phrase in phrases for token in phrase}
+        postings = {}
+        matches = None
+        for token in sorted(required, key=doc_freq.get):
+            columns = "entry_id, tf, length, " + ("positions" if token in phrase_tokens else "''")
+            if matches is not None and len(matches) <= MAX_IN_CLAUSE:
+                ids = list(matches)
+                rows = self._db.execute(
+                    f"SELECT {columns} FROM postings WHERE token = ? "
+                    f"AND entry_id IN ({','.join('?' * len(ids))})",
+                    [token] + ids,
+                )
+            else:
+                rows = self._db.execute(f"SELECT {columns} FROM postings WHERE token = ?", (token,))
+            postings[token] = {entry_id: (tf, length, positions)
+                               for entry_id, tf, length, positions in rows}
+
+            ids = postings[token].keys()
+            matches = set(ids) if matches is None else matches & ids
+            if candidates is not None and len(postings) == 1:
+                matches = {entry_id for entry_id in matches if candidates(entry_id)}
+            if not matches:
+                return None
+        return doc_count, avg_length, doc_freq, postings, matches
+
+    @staticmethod
+    def _has_phrase(postings, phrase, entry_id):
+        starts = {int(p) for p in postings[phrase[0]][entry_id][2].split(",")}
+        for offset, token in enumerate(phrase[1:], start=1):
+            positions = {int(p) - offset for p in postings[token][entry_id][2].split(",")}
+            starts &= positions
+            if not starts:
+                return False
+        return True
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
@@ -1,37 +1,125 @@
-import nltk
-from nltk.sentiment import SentimentIntensityAnalyzer
+import hashlib
+import json
+import os
+import threading
 import numpy as np
+from vader_lexicon import load_lexicon
+from emotion_lexicon import EmotionMatcher, tokenize
+from analysis_cache import AnalysisCache
+from instrumentation import timed
+
+# Bump when the scoring rules in this module change so cached results are ignored
+ANALYZER_VERSION = 3
+
+
+def _build_vader():
+    """
+    Build a VADER analyzer from the pre-parsed lexicon snapshot instead of
+    letting NLTK re-read and re-parse the lexicon text file
+    """
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer, VaderConstants
+
+    sia = SentimentIntensityAnalyzer.__new__(SentimentIntensityAnalyzer)
+    sia.lexicon = load_lexicon()
+    sia.constants = VaderConstants()
+    return sia
+
+
+def sentiment_label(compound_score):
+    """
+    Map a VADER compound score to Positive/Negative/Neutral
+    """
+    if compound_score >= 0.05:
+        return "Positive"
+    if compound_score <= -0.05:
+        return "Negative"
+    return "Neutral"
+
+
+def emotion_intensities(counts, vader_scores):
+    """
+    Turn per-emotion keyword counts into 0-1 intensities, boosted by VADER's
+    positive/negative proportions
+    """
+    emotions = {emotion: min(count / 2, 1.0) for emotion, count in counts.items()}  # Normalize to max of 1.0
+    
+    # Influence emotion scores based on VADER
+    if vader_scores['pos'] > 0.2 and "joy" in emotions:
+        emotions["joy"] = max(emotions["joy"], vader_scores['pos'])
+    if vader_scores['neg'] > 0.2:
+        if "sadness" in emotions:
+            emotions["sadness"] = max(emotions["sadness"], vader_scores['neg'] * 0.7)
+        if "anger" in emotions:
+            emotions["anger"] = max(emotions["anger"], vader_scores['neg'] * 0.5)
+    
+    return emotions
 
-# Ensure NLTK data is downloaded
-try:
-    nltk.data.find('vader_lexicon')
-except LookupError:
-    nltk.download('vader_lexicon')
 
 class SentimentAnalyzer:
-    def __init__(self):
-        # Initialize VADER sentiment analyzer
-        self.sia = SentimentIntensityAnalyzer()
+    def __init__(self, emotion_lexicon=None, cache=None):
+        # Emotion keywords are compiled once; pass a JSON lexicon path to extend them
+        if emotion_lexicon:
+            self.emotion_matcher = EmotionMatcher.from_file(emotion_lexicon)
+        else:
+            self.emotion_matcher = EmotionMatcher()
+        # VADER is loaded lazily on the first analysis
+        self._sia = None
+        self._sia_lock = threading.Lock()
         # We'll use only VADER for simplicity
         self.has_transformer = False
+        # Optional AnalysisCache for memoized results
+        self.cache = cache
+        self._version = None
+
+    @property
+    def sia(self):
+        if self._sia is None:
+            with self._sia_lock:
+                if self._sia is None:
+                    self._sia = _build_vader()
+        return self._sia
+    
+    @property
+    def version(self):
+        """
+        Fingerprint of the scoring rules, lexicon and emotion keywords;
+        changes whenever any of them would give different results. First
+        computed on the first cached analysis, which is also when results
+        of older versions are dropped from an on-disk cache.
+        """
+        if self._version is None:
+            digest = hashlib.sha1()
+            digest.update(str(ANALYZER_VERSION).encode())
+            digest.update(json.dumps(sorted(self.sia.lexicon.items())).encode())
+            digest.update(json.dumps(self.emotion_matcher.keywords, sort_keys=True).encode())
+            version = digest.hexdigest()[:16]
+            if self.cache is not None and self.cache.path:
+                # Results of older analyzer versions can never match again
+                self.cache.prune(version)
+            self._version = version
+        return self._version
     
+    @timed("analyze_text")
     def analyze_text(self, text):
         """
         Analyze text sentiment using VADER
         Returns sentiment label, score, and emotional categories
         """
+        if self.cache is None:
+            return self._analyze_text(text)
+        
+        key = self.cache.make_key(text, self.version)
+        result = self.cache.get(key)
+        if result is None:
+            result = self._analyze_text(text)
+            self.cache.put(key, result, self.version)
+        return result
+    
+    def _analyze_text(self, text):
         # Basic sentiment scores from VADER
         vader_scores = self.sia.polarity_scores(text)
         compound_score = vader_scores['compound']
         
-        # Default sentiment categorization with VADER
-        if compound_score >= 0.05:
-            sentiment_label = "Positive"
-        elif compound_score <= -0.05:
-            sentiment_label = "Negative"
-        else:
-            sentiment_label = "Neutral"
-        
         # Use only VADER score
         final_score = compound_score
         
@@ -39,40 +127,99 @@ class SentimentAnalyzer:
         emotions = self._extract_emotions(text, vader_scores)
         
         return {
-            "label": sentiment_label,
+            "label": sentiment_label(compound_score),
             "score": final_score,
             "emotions": emotions,
             "raw_vader": vader_scores
         }
     
-    def _extract_emotions(self, text, vader_scores):
+    @timed("analyze_batch")
+    def analyze_batch(self, texts):
         """
-        Extract specific emotional categories based on lexical analysis
-        This is a simple implementation - could be improved with a dedicated emotion classifier
+        Analyze many texts at once
+        Returns a list of results in the same format as analyze_text
         """
-        emotions = {}
+        texts = list(texts)
+        if self.cache is None:
+            return self._analyze_batch(texts)
         
-        # Emotion keywords (simple implementation)
-        emotion_keywords = {
-            "joy": ["happy", "joy", "delighted", "pleasure", "excited", "glad", "smile"],
-            "sadness": ["sad", "unhappy", "depressed", "down", "miserable", "gloomy", "tearful"],
-            "anger": ["angry", "mad", "furious", "outraged", "annoyed", "irritated", "frustrated"],
-            "fear": ["afraid", "scared", "terrified", "anxious", "worried", "nervous", "panic"],
-            "surprise": ["surprised", "amazed", "astonished", "shocked", "unexpected"],
-            "disgust": ["disgusted", "revolted", "nauseated", "appalled", "repulsed"]
-        }
+        keys = [self.cache.make_key(text, self.version) for text in texts]
+        results = [self.cache.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            computed = self._analyze_batch([texts[i] for i in missing])
+            for i, result in zip(missing, computed):
+                results[i] = result
+            self.cache.put_many(((keys[i], results[i]) for i in missing), self.version)
+        return results
+    
+    def _analyze_batch(self, texts):
+        if not texts:
+            return []
         
-        # Count occurrences of emotion words
-        text_lower = text.lower()
-        for emotion, keywords in emotion_keywords.items():
-            count = sum(1 for keyword in keywords if keyword in text_lower)
-            emotions[emotion] = min(count / 2, 1.0)  # Normalize to max of 1.0
+        matcher = self.emotion_matcher
+        vader_results = [self.sia.polarity_scores(text) for text in texts]
         
-        # Influence emotion scores based on VADER
-        if vader_scores['pos'] > 0.2:
-            emotions["joy"] = max(emotions["joy"], vader_scores['pos'])
-        if vader_scores['neg'] > 0.2:
-            emotions["sadness"] = max(emotions["sadness"], vader_scores['neg'] * 0.7)
-            emotions["anger"] = max(emotions["anger"], vader_scores['neg'] * 0.5)
+        # Emotion keyword counts as an (entries x emotions) matrix
+        counts = np.array([matcher.count_tokens(tokenize(text)) for text in texts], dtype=np.float64)
+        counts = counts.reshape(len(texts), len(matcher.emotions))
+        compound = np.array([v['compound'] for v in vader_results])
+        pos = np.array([v['pos'] for v in vader_results])
+        neg = np.array([v['neg'] for v in vader_results])
+        
+        labels = np.where(compound >= 0.05, "Positive",
+                          np.where(compound <= -0.05, "Negative", "Neutral"))
+        
+        # Same normalization and VADER adjustments as emotion_intensities, per column
+        emotion_matrix = np.minimum(counts / 2, 1.0)
+        adjustments = [("joy", pos, pos > 0.2, 1.0),
+                       ("sadness", neg, neg > 0.2, 0.7),
+                       ("anger", neg, neg > 0.2, 0.5)]
+        for emotion, values, mask, weight in adjustments:
+            if emotion in matcher.emotions:
+                column = matcher.emotions.index(emotion)
+                boosted = np.maximum(emotion_matrix[:, column], values * weight)
+                emotion_matrix[:, column] = np.where(mask, boosted, emotion_matrix[:, column])
         
-        return emotions 
\ No newline at end of file
+        results = []
+        for label, vader_scores, row in zip(labels.tolist(), vader_results, emotion_matrix.tolist()):
+            results.append({
+                "label": label,
+                "score": vader_scores['compound'],
+                "emotions": dict(zip(matcher.emotions, row)),
+                "raw_vader": vader_scores
+            })
+        return results
+    
+    @timed("extract_emotions")
+    def _extract_emotions(self, text, vader_scores):
+        """
+        Extract specific emotional categories based on lexical analysis
+        This is a simple implementation - could be improved with a dedicated emotion classifier
+        """
+        # Count distinct emotion words in a single pass over the text
+        counts = self.emotion_matcher.count(text)
+        return emotion_intensities(counts, vader_scores)
+
+
+_analyzer = None
+_analyzer_lock = threading.Lock()
+
+
+def get_sentiment_analyzer():
+    """
+    Return the process-wide SentimentAnalyzer, creating it on first use.
+    Set EMOTION_LEXICON to a JSON file to extend the emotion keywords,
+    ANALYSIS_CACHE_SIZE to bound the in-memory result cache and
+    ANALYSIS_CACHE_PATH to also keep results on disk across restarts.
+    """
+    global _analyzer
+    if _analyzer is None:
+        with _analyzer_lock:
+            if _analyzer is None:
+                cache = AnalysisCache(
+                    max_size=int(os.environ.get("ANALYSIS_CACHE_SIZE", 2048)),
+                    path=os.environ.get("ANALYSIS_CACHE_PATH"),
+                )
+                _analyzer = SentimentAnalyzer(os.environ.get("EMOTION_LEXICON"), cache=cache)
+    return _analyzer
@@ -0,0 +1,423 @@
+"""
+Headless HTTP analysis service.
+
+A plain ASGI application (no web framework) exposing the analyzer, the
+response generator and read-only journal queries to other local tools:
+
+    GET  /health
+    POST /analyze   {"text": "..."} or {"texts": ["...", ...]}
+    POST /respond   {"text": "..."} -> analysis plus response and strategy
+    GET  /entries   ?user=&start=&end=&sentiment=&q=&offset=&limit=
+
+Each worker process builds one SentimentAnalyzer and ResponseGenerator at
+startup and reuses them for every request. Texts from concurrent requests
+are coalesced into one analyze_batch call of up to MAX_BATCH texts: whatever
+queued up while the previous batch ran is taken at once, and while requests
+keep arriving together the first text also holds the batch open for a
+short window (BATCH_WINDOW_MS) so others can join it. The queue in front
+of the batcher is bounded; when it is full, requests are rejected with 503
+and a Retry-After header instead of piling up.
+
+Journals are opened read-only: the service never migrates, compacts or
+analyzes them, and unknown users get 404 rather than a new journal
+directory. At most MAX_OPEN_JOURNALS stay open, least recently used first
+to close.
+
+Usage:
+    python service.py [--port 8765] [--workers 1]
+
+Serving requires uvicorn (pip install uvicorn). /entries serves any user's
+journal without authentication, so --host only accepts loopback addresses.
+"""
+import argparse
+import asyncio
+import datetime
+import ipaddress
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+from sentiment_analyzer import get_sentiment_analyzer
+from response_generator import get_response_generator
+from entry_repository import SENTIMENT_LABELS
+from user_journal import DATA_DIR, DEFAULT_USER, UserJournal
+from instrumentation import metrics
+
+DEFAULT_PORT = 8765
+BATCH_WINDOW_MS = float(os.environ.get("SERVICE_BATCH_WINDOW_MS", 5))
+MAX_BATCH = int(os.environ.get("SERVICE_MAX_BATCH", 64))
+# Texts waiting for the batcher before requests are turned away
+QUEUE_SIZE = int(os.environ.get("SERVICE_QUEUE_SIZE", 1024))
+MAX_BODY_BYTES = 1 << 20
+MAX_TEXTS_PER_REQUEST = 256
+MAX_PAGE_SIZE = 500
+MAX_OPEN_JOURNALS = int(os.environ.get("SERVICE_MAX_JOURNALS", 32))
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=()):
+        super().__init__(message)
+        self.status = status
+        self.headers = list(headers)
+
+
+class Overloaded(HTTPError):
+    def __init__(self):
+        super().__init__(503, "analysis queue is full", [(b"retry-after", b"1")])
+
+
+class MicroBatcher:
+    """
+    Coalesces texts submitted by concurrent requests into analyze_batch
+    calls, run one at a time on a dedicated thread
+    """
+
+    def __init__(self, analyzer, window=BATCH_WINDOW_MS / 1000, max_batch=MAX_BATCH, queue_size=QUEUE_SIZE):
+        self.analyzer = analyzer
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.texts = 0
+        self.rejected = 0
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analyze")
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(Overloaded())
+        self._executor.shutdown(wait=False)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    async def analyze_many(self, texts):
+        """
+        Queue texts for the next batches and wait for their results.
+        Raises Overloaded, without queueing anything, if they don't fit.
+        """
+        if self._queue.maxsize - self._queue.qsize() < len(texts):
+            self.rejected += 1
+            raise Overloaded()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self._queue.put_nowait((text, future))
+            futures.append(future)
+        return await asyncio.gather(*futures)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        window = 0.0
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + window
+            while len(batch) < self.max_batch:
+                # Take what is already queued without waiting
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Requests that gave up (client disconnected) don't need analyzing
+            batch = [(text, future) for text, future in batch if not future.done()]
+            if not batch:
+                continue
+            texts = [text for text, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self.analyzer.analyze_batch, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.texts += len(texts)
+            # Only hold the next batch open while requests are arriving
+            # together; a lone caller shouldn't pay the window every time
+            window = self.window if len(texts) > 1 else 0.0
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+def _public(result):
+    return {"label": result["label"], "score": result["score"], "emotions": result["emotions"]}
+
+
+def _parse_date(params, name):
+    value = params.get(name)
+    if value is None:
+        return None
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise HTTPError(400, f"{name} must be a YYYY-MM-DD date")
+
+
+def _parse_int(params, name, default, maximum=None):
+    value = params.get(name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise HTTPError(400, f"{name} must be an integer")
+    if number < 0:
+        raise HTTPError(400, f"{name} must not be negative")
+    return number if maximum is None else min(number, maximum)
+
+
+class AnalysisService:
+    """
+    The ASGI application. One instance per worker process.
+    """
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = data_dir
+        self.analyzer = None
+        self.generator = None
+        self.batcher = None
+        self._journals = OrderedDict()
+        # Journal reads and refreshes all happen on this thread
+        self._journal_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal")
+        self._started = time.monotonic()
+        self._startup_lock = asyncio.Lock()
+        self._routes = {
+            ("GET", "/health"): self.health,
+            ("POST", "/analyze"): self.analyze,
+            ("POST", "/respond"): self.respond,
+            ("GET", "/entries"): self.entries,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def startup(self):
+        # Built once per worker: VADER and the emotion lexicon load here, not per request
+        self.analyzer = get_sentiment_analyzer()
+        self.generator = get_response_generator()
+        self.batcher = MicroBatcher(self.analyzer)
+        self.batcher.start()
+
+    async def shutdown(self):
+        if self.batcher is not None:
+            await self.batcher.stop()
+        await asyncio.get_running_loop().run_in_executor(self._journal_executor, self._close_journals)
+        self._journal_executor.shutdown(wait=False)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        # Servers without lifespan support (or a disabled one) start us lazily
+        if self.batcher is None:
+            async with self._startup_lock:
+                if self.batcher is None:
+                    await self.startup()
+
+        route = (scope["method"], scope["path"])
+        try:
+            handler = self._routes.get(route)
+            if handler is None:
+                if any(path == scope["path"] for _, path in self._routes):
+                    raise HTTPError(405, "method not allowed")
+                raise HTTPError(404, "not found")
+            with metrics.stage(f"service.{handler.__name__}"):
+                status, body, headers = 200, await handler(scope, receive), []
+        except HTTPError as e:
+            status, body, headers = e.status, {"error": str(e)}, e.headers
+
+        payload = json.dumps(body).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"),
+                        (b"content-length", str(len(payload)).encode())] + headers,
+        })
+        await send({"type": "http.response.body", "body": payload})
+
+    @staticmethod
+    async def _read_json(receive):
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise HTTPError(400, "client disconnected")
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > MAX_BODY_BYTES:
+                raise HTTPError(413, f"request body is larger than {MAX_BODY_BYTES} bytes")
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                break
+        try:
+            return json.loads(b"".join(chunks) or b"null")
+        except ValueError:
+            raise HTTPError(400, "request body must be JSON")
+
+    @staticmethod
+    def _texts(body):
+        """
+        (texts, single) from a {"text": ...} or {"texts": [...]} body
+        """
+        if isinstance(body, dict) and isinstance(body.get("text"), str):
+            return [body["text"]], True
+        if isinstance(body, dict) and isinstance(body.get("texts"), list) \
+                and all(isinstance(text, str) for text in body["texts"]):
+            if len(body["texts"]) > MAX_TEXTS_PER_REQUEST:
+                raise HTTPError(413, f"at most {MAX_TEXTS_PER_REQUEST} texts per request")
+            return body["texts"], False
+        raise HTTPError(400, 'expected {"text": "..."} or {"texts": ["...", ...]}')
+
+    async def health(self, scope, receive):
+        return {
+            "status": "ok",
+            "uptime_s": round(time.monotonic() - self._started, 1),
+            "queued": self.batcher.pending(),
+            "batches": self.batcher.batches,
+            "texts": self.batcher.texts,
+            "rejected": self.batcher.rejected,
+        }
+
+    async def analyze(self, scope, receive):
+        texts, single = self._texts(await self._read_json(receive))
+        results = [_public(result) for result in await self.batcher.analyze_many(texts)]
+        return results[0] if single else {"results": results}
+
+    async def respond(self, scope, receive):
+        texts, single = self._texts(await self._read_json(receive))
+        results = await self.batcher.analyze_many(texts)
+        replies = self.generator.generate_batch(texts, results)
+        results = [dict(_public(result), response=response, strategy=strategy)
+                   for result, (response, strategy) in zip(results, replies)]
+        return results[0] if single else {"results": results}
+
+    async def entries(self, scope, receive):
+        params = {key: values[-1] for key, values in parse_qs(scope["query_string"].decode("latin-1")).items()}
+        sentiment = params.get("sentiment")
+        labels = sentiment.split(",") if sentiment else None
+        if labels is not None and any(label not in SENTIMENT_LABELS for label in labels):
+            raise HTTPError(400, f"sentiment must be one or more of {', '.join(SENTIMENT_LABELS)}")
+        query = {
+            "user": params.get("user", DEFAULT_USER),
+            "start": _parse_date(params, "start"),
+            "end": _parse_date(params, "end"),
+            "labels": labels,
+            "search": params.get("q", "").strip(),
+            "offset": _parse_int(params, "offset", 0),
+            "limit": _parse_int(params, "limit", 50, MAX_PAGE_SIZE),
+        }
+        return await asyncio.get_running_loop().run_in_executor(
+            self._journal_executor, lambda: self._query_journal(**query))
+
+    def _journal(self, user_id):
+        journal = self._journals.get(user_id)
+        if journal is not None:
+            self._journals.move_to_end(user_id)
+            return journal
+        try:
+            journal = UserJournal(user_id, self.data_dir, read_only=True)
+        except FileNotFoundError:
+            raise HTTPError(404, f"no journal for user {user_id!r}")
+        self._journals[user_id] = journal
+        while len(self._journals) > MAX_OPEN_JOURNALS:
+            self._journals.popitem(last=False)[1].close()
+        return journal
+
+    def _query_journal(self, user, start, end, labels, search, offset, limit):
+        """
+        Newest-first page of a user's entries, or best search matches first when searching
+        """
+        journal = self._journal(user)
+        journal.refresh()
+        repository = journal.repository
+        if search:
+            def candidates(entry_id):
+                if not repository.matches(entry_id, start, labels):
+                    return False
+                return end is None or repository.get(entry_id)["date"][:10] <= end.isoformat()
+
+            results = journal.search_index.search(search, candidates=candidates)
+            total = len(results)
+            page = [repository.get(entry_id) for entry_id, _ in results[offset:offset + limit]]
+        else:
+            total = repository.count(start=start, end=end, labels=labels)
+            page = repository.query(start=start, end=end, labels=labels, newest_first=True,
+                                    offset=offset, limit=limit)
+        return {"total": total, "offset": offset, "entries": page}
+
+    def _close_journals(self):
+        for journal in self._journals.values():
+            journal.close()
+        self._journals.clear()
+
+
+app = AnalysisService()
+
+
+def is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve journal analysis over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes")
+    args = parser.parse_args()
+    if not is_loopback(args.host):
+        parser.error(f"--host must be a loopback address, not {args.host!r}: "
+                     "journals are served without authentication")
+
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("Serving requires uvicorn: pip install uvicorn")
+    uvicorn.run("service:app", host=args.host, port=args.port, workers=args.workers,
+                log_level="warning", app_dir=os.path.dirname(os.path.abspath(__file__)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from journal_store import JsonlJournalStore
+
+
+def open_store(tmp_path):
+    return JsonlJournalStore(str(tmp_path / "journal.jsonl"), legacy_path=None, compact_interval=0)
+
+
+def test_append_after_torn_last_line(tmp_path):
+    store = open_store(tmp_path)
+    store.append({"id": "a", "date": "2024-01-01", "text": "first"})
+    # A crash halfway through writing the next record
+    with open(store.path, "a") as f:
+        f.write('{"op": "put", "entry": {"id": "lost", "da')
+    store.append({"id": "b", "date": "2024-01-02", "text": "second"})
+    store.close()
+
+    store = open_store(tmp_path)
+    assert [entry["id"] for entry in store.load()] == ["a", "b"]
+    store.close()
+
+
+def test_other_process_sees_append_after_torn_line(tmp_path):
+    reader = open_store(tmp_path)
+    writer = open_store(tmp_path)
+    writer.append({"id": "a", "date": "2024-01-01", "text": "first"})
+    reader.load()
+    with open(writer.path, "a") as f:
+        f.write('{"op": "put"')
+    writer.append({"id": "b", "date": "2024-01-02", "text": "second"})
+    assert [record["entry"]["id"] for record in reader.changes()] == ["b"]
+    reader.close()
+    writer.close()
@@ -0,0 +1,226 @@
+"""
+Per-user journal shards.
+
+Each user gets their own directory holding the journal log, search index
+and analysis job table. A UserJournal bundles those with an in-memory
+EntryRepository and is shared by every session of that user in the
+process, so opening more tabs doesn't multiply memory. Writes go through
+the store with optimistic version checks: before each write the shard
+catches up with anything other processes appended, and if another write
+slips in between, the store raises ConflictError and the write is retried.
+"""
+import contextlib
+import hashlib
+import os
+import re
+import threading
+from journal_store import ConflictError, JsonlJournalStore, JOURNAL_FILE, LEGACY_FILE
+from entry_repository import EntryRepository
+from search_index import SearchIndex, INDEX_FILE
+from analysis_queue import AnalysisQueue, JOBS_FILE, PENDING_LABEL
+from analytics_snapshot import AnalyticsSnapshot, SNAPSHOT_DIR, available as snapshots_available
+
+DATA_DIR = os.environ.get("JOURNAL_DATA_DIR", ".")
+DEFAULT_USER = "default"
+WRITE_ATTEMPTS = 5
+
+
+def user_directory(user_id, data_dir=DATA_DIR):
+    """
+    Directory holding a user's files. The default user keeps the original
+    top-level files so existing journals keep working.
+    """
+    if user_id == DEFAULT_USER:
+        return data_dir
+    # Readable prefix plus a hash, so user ids can never escape the data directory
+    slug = re.sub(r"[^a-z0-9]+", "-", user_id.lower()).strip("-")[:32]
+    digest = hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(data_dir, "users", f"{slug}-{digest}" if slug else digest)
+
+
+class UserJournal:
+    def __init__(self, user_id, data_dir=DATA_DIR, read_only=False):
+        """
+        read_only opens an existing journal for queries only: no legacy
+        migration, log compaction, indexing, analysis jobs or snapshot, so
+        it can sit alongside the app that owns the journal
+        """
+        self.user_id = user_id
+        self.read_only = read_only
+        self.directory = user_directory(user_id, data_dir)
+        journal_path = os.path.join(self.directory, JOURNAL_FILE)
+        if read_only:
+            if not os.path.isdir(self.directory):
+                raise FileNotFoundError(f"no journal for user {user_id!r}")
+            legacy_path = None
+        else:
+            os.makedirs(self.directory, exist_ok=True)
+            legacy_path = os.path.join(self.directory, LEGACY_FILE) if user_id == DEFAULT_USER else None
+
+        self._lock = threading.RLock()
+        # Keeps search index updates, made outside _lock, in repository order
+        self._index_lock = threading.Lock()
+        self.store = JsonlJournalStore(journal_path, legacy_path, compact_interval=0 if read_only else 300)
+        self.search_index = SearchIndex(os.path.join(self.directory, INDEX_FILE), read_only)
+        self.repository = EntryRepository(self.store.load())
+        self.analysis_queue = None
+        self.snapshot = None
+        if read_only:
+            return
+        # Catch up if the search index was deleted or missed writes
+        self.search_index.apply(self._index_changes())
+        self.analysis_queue = AnalysisQueue(self, os.path.join(self.directory, JOBS_FILE))
+        self.analysis_queue.resume(self.repository.query(labels=[PENDING_LABEL]))
+        # Columnar copy of the analytic fields, when pyarrow is installed
+        if snapshots_available():
+            self.snapshot = AnalyticsSnapshot(self.store, os.path.join(self.directory, SNAPSHOT_DIR))
+
+    def __len__(self):
+        return len(self.repository)
+
+    def reading(self):
+        """
+        Context manager to hold while reading the repository, its aggregates
+        or the search index. The repository is shared by all of the user's
+        sessions and updated from background threads, so reads must not
+        overlap a write.
+        """
+        return self._lock
+
+    @contextlib.contextmanager
+    def _changing(self):
+        """
+        Hold the journal lock while changing the repository. Records added
+        to the yielded list are applied to the search index after the lock
+        is released, so readers aren't held up while a large batch is
+        indexed. A read-only journal leaves the index to its owner.
+        """
+        index_records = []
+        with self._lock:
+            yield index_records
+            if self.read_only:
+                return
+            self._index_lock.acquire()
+        try:
+            self.search_index.apply(index_records)
+        finally:
+            self._index_lock.release()
+
+    def _index_changes(self):
+        """
+        Records that bring the search index in line with the repository.
+        Empty when the two hold the same ids, so an unchanged journal is
+        never re-indexed.
+        """
+        indexed = self.search_index.ids()
+        current = self.repository.ids()
+        records = [{"op": "delete", "id": entry_id} for entry_id in indexed.difference(current)]
+        records.extend({"op": "put", "entry": self.repository.get(entry_id)}
+                       for entry_id in current if entry_id not in indexed)
+        return records
+
+    def _catch_up(self, index_records):
+        """
+        Apply records other processes wrote to the repository, collecting
+        what the search index needs. Returns True if anything changed.
+        """
+        records = self.store.changes()
+        if records is None:
+            # The log was rewritten, most likely just compacted
+            self.repository = EntryRepository(self.store.load())
+            if not self.read_only:
+                index_records.extend(self._index_changes())
+            return True
+        for record in records:
+            if record.get("op") == "put":
+                self.repository.add(record["entry"])
+            elif record.get("op") == "delete":
+                self.repository.remove(record["id"])
+        index_records.extend(records)
+        return bool(records)
+
+    def refresh(self):
+        """
+        Apply entries written by other processes since the last call.
+        Returns True if anything changed.
+        """
+        with self._changing() as index_records:
+            return self._catch_up(index_records)
+
+    def _write(self, write, index_records):
+        """
+        Run write(expected_version) after catching up with the store,
+        retrying when another process wins the race
+        """
+        if self.read_only:
+            raise PermissionError(f"journal of {self.user_id!r} was opened read-only")
+        for _ in range(WRITE_ATTEMPTS):
+            self._catch_up(index_records)
+            try:
+                return write(self.store.version)
+            except ConflictError:
+                continue
+        raise ConflictError(f"could not write to {self.store.path} after {WRITE_ATTEMPTS} attempts")
+
+    def append(self, entry):
+        with self._changing() as index_records:
+            self._write(lambda version: self.store.append(entry, expected_version=version), index_records)
+            self.repository.add(entry)
+            index_records.append({"op": "put", "entry": entry})
+        return entry["id"]
+
+    def append_many(self, entries):
+        entries = list(entries)
+        with self._changing() as index_records:
+            ids = self._write(lambda version: self.store.append_many(entries, expected_version=version),
+                              index_records)
+            for entry in entries:
+                self.repository.add(entry)
+            index_records.extend({"op": "put", "entry": entry} for entry in entries)
+        return ids
+
+    def update(self, entry):
+        """
+        Store a finished analysis, unless the entry was deleted or replaced meanwhile
+        """
+        with self._changing() as index_records:
+            def write(version):
+                current = self.repository.get(entry["id"])
+                if current is None or current.get("sentiment") != PENDING_LABEL:
+                    return False
+                self.store.update(entry, expected_version=version)
+                return True
+
+            if self._write(write, index_records):
+                self.repository.add(entry)
+
+    def delete(self, entry_id):
+        # Drop the job first so a finishing analysis doesn't store its result
+        if self.analysis_queue is not None:
+            self.analysis_queue.cancel(entry_id)
+        with self._changing() as index_records:
+            def write(version):
+                if entry_id not in self.repository:
+                    return False
+                self.store.delete(entry_id, expected_version=version)
+                return True
+
+            if self._write(write, index_records):
+                self.repository.remove(entry_id)
+                index_records.append({"op": "delete", "id": entry_id})
+
+    def analytics(self, start=None):
+        """
+        pyarrow Table of date, sentiment, score and emotion columns for
+        entries dated on or after start, or None without pyarrow
+        """
+        if self.snapshot is None:
+            return None
+        self.snapshot.refresh()
+        return self.snapshot.table(start)
+
+    def close(self):
+        if self.analysis_queue is not None:
+            self.analysis_queue.shutdown()
+        self.store.close()
+        self.search_index.close()
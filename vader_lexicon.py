@@ -0,0 +1,75 @@
+"""
+Pre-parsed snapshot of the VADER lexicon.
+
+NLTK's SentimentIntensityAnalyzer reads and parses the ~7,500 line lexicon
+text file every time it is constructed, and the lexicon itself has to be
+downloaded first. We parse it once, pickle the resulting dict next to this
+module and load that instead, so a cold start needs neither the network nor
+the text parser.
+
+Rebuild the snapshot with:
+    python vader_lexicon.py
+"""
+import os
+import pickle
+
+SNAPSHOT_PATH = os.environ.get(
+    "VADER_LEXICON_SNAPSHOT",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "vader_lexicon.pickle"),
+)
+SNAPSHOT_FORMAT = 1
+NLTK_LEXICON = "sentiment/vader_lexicon.zip/vader_lexicon/vader_lexicon.txt"
+
+
+def parse_nltk_lexicon():
+    """
+    Parse the lexicon shipped with nltk_data, downloading it if needed
+    """
+    import nltk
+
+    try:
+        nltk.data.find(NLTK_LEXICON)
+    except LookupError:
+        nltk.download('vader_lexicon')
+
+    lexicon = {}
+    for line in nltk.data.load(NLTK_LEXICON).split("\n"):
+        word, measure = line.strip().split("\t")[0:2]
+        lexicon[word] = float(measure)
+    return lexicon
+
+
+def build_snapshot(path=SNAPSHOT_PATH, lexicon=None):
+    if lexicon is None:
+        lexicon = parse_nltk_lexicon()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump({"format": SNAPSHOT_FORMAT, "lexicon": lexicon}, f, protocol=4)
+    os.replace(tmp_path, path)
+    return lexicon
+
+
+def load_lexicon(path=SNAPSHOT_PATH):
+    """
+    Return the VADER lexicon as a dict, preferring the bundled snapshot
+    """
+    try:
+        with open(path, "rb") as f:
+            snapshot = pickle.load(f)
+        if snapshot.get("format") == SNAPSHOT_FORMAT:
+            return snapshot["lexicon"]
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        pass
+
+    # No usable snapshot: fall back to NLTK and cache the result for next time
+    lexicon = parse_nltk_lexicon()
+    try:
+        build_snapshot(path, lexicon)
+    except OSError as e:
+        print(f"Warning: could not write VADER lexicon snapshot: {e}")
+    return lexicon
+
+
+if __name__ == "__main__":
+    lexicon = build_snapshot()
+    print(f"Wrote {len(lexicon)} lexicon entries to {SNAPSHOT_PATH}")